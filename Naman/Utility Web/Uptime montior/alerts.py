@@ -0,0 +1,300 @@
+"""
+Alerts - per-URL state machine and batched email dispatch.
+Each URL moves UP -> SUSPECT -> DOWN -> RECOVERED -> UP, and only the
+transitions into DOWN and RECOVERED raise an alert. A background thread
+sends alerts as digests over one reused SMTP connection.
+"""
+
+import queue
+import smtplib
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from email.message import EmailMessage
+
+from metrics import Counter, Gauge
+
+UP = 'UP'
+SUSPECT = 'SUSPECT'
+DOWN = 'DOWN'
+RECOVERED = 'RECOVERED'
+FLAPPING = 'FLAPPING'
+SLOW = 'SLOW'
+
+FAIL_THRESHOLD = 3      # consecutive failures before a URL is DOWN
+RECOVER_THRESHOLD = 2   # consecutive successes before a DOWN URL is RECOVERED
+FLAP_WINDOW = 3600      # seconds of DOWN/RECOVERED history to look at
+FLAP_LIMIT = 4          # transitions in the window that count as flapping
+
+SMTP_HOST = 'smtp.gmail.com'
+SMTP_PORT = 587
+SENDER = 'monitor@example.com'
+RECIPIENTS = ['admin@example.com']
+DIGEST_INTERVAL = 30    # seconds to collect alerts into one email
+MAX_DIGEST = 100        # alerts per email at most
+SMTP_IDLE_CHECK = 60    # seconds idle before the connection is NOOP-checked
+
+ALERTS = Counter('uptime_alerts_total', 'Alerts raised, by kind', ['kind'])
+EMAILS = Counter('uptime_alert_emails_total', 'Digest emails, by outcome', ['outcome'])
+ALERT_QUEUE = Gauge('uptime_alert_queue_depth', 'Alerts and flush requests waiting to be sent')
+
+_STOP = object()
+
+
+class Alert:
+    def __init__(self, url, kind, timestamp=None, detail='', recipients=None):
+        """One alert: kind is DOWN, RECOVERED, FLAPPING or SLOW.
+
+        recipients overrides the dispatcher's default address list.
+        """
+        self.url = url
+        self.kind = kind
+        self.timestamp = timestamp or datetime.now()
+        self.detail = detail
+        self.recipients = tuple(recipients) if recipients else None
+
+    def __repr__(self):
+        return f"Alert({self.url!r}, {self.kind!r})"
+
+    def line(self):
+        """One-line text for an email body."""
+        text = f"[{self.timestamp:%Y-%m-%d %H:%M:%S}] {self.kind}: {self.url}"
+        return f"{text} ({self.detail})" if self.detail else text
+
+
+class UrlState:
+    def __init__(self):
+        """Start out UP with no history."""
+        self.state = UP
+        self.failures = 0
+        self.successes = 0
+        self.flapping = False
+        self.transitions = deque()
+
+
+class AlertTracker:
+    def __init__(self, fail_threshold=FAIL_THRESHOLD, recover_threshold=RECOVER_THRESHOLD,
+                 flap_window=FLAP_WINDOW, flap_limit=FLAP_LIMIT):
+        """Track check results per URL and decide when to alert."""
+        self.fail_threshold = fail_threshold
+        self.recover_threshold = recover_threshold
+        self.flap_window = flap_window
+        self.flap_limit = flap_limit
+        self.urls = {}
+
+    def state(self, url):
+        """Current state name for url."""
+        entry = self.urls.get(url)
+        return entry.state if entry else UP
+
+    def record(self, url, is_up, now=None):
+        """Feed one check result; return an Alert or None.
+
+        Repeated failures of a URL that is already DOWN return None, so a
+        long outage produces one alert, not one per sweep.
+        """
+        if now is None:
+            now = time.monotonic()
+        entry = self.urls.get(url)
+        if entry is None:
+            entry = self.urls[url] = UrlState()
+
+        if is_up:
+            entry.failures = 0
+            entry.successes += 1
+            if entry.state == SUSPECT:
+                entry.state = UP
+            elif entry.state == RECOVERED:
+                entry.state = UP
+            elif entry.state == DOWN and entry.successes >= self.recover_threshold:
+                entry.state = RECOVERED
+                return self._transition(entry, url, RECOVERED, now)
+        else:
+            entry.successes = 0
+            entry.failures += 1
+            if entry.state in (UP, RECOVERED):
+                entry.state = SUSPECT
+            if entry.state == SUSPECT and entry.failures >= self.fail_threshold:
+                entry.state = DOWN
+                return self._transition(entry, url, DOWN, now)
+
+        if entry.flapping and now - entry.transitions[-1] > self.flap_window:
+            # No state changes for a whole window: report where it settled.
+            entry.flapping = False
+            entry.transitions.clear()
+            kind = DOWN if entry.state == DOWN else RECOVERED
+            return Alert(url, kind, detail='stopped flapping')
+        return None
+
+    def _transition(self, entry, url, kind, now):
+        """Record a DOWN/RECOVERED transition and apply flap suppression."""
+        transitions = entry.transitions
+        transitions.append(now)
+        while transitions and now - transitions[0] > self.flap_window:
+            transitions.popleft()
+
+        if len(transitions) >= self.flap_limit:
+            if entry.flapping:
+                return None
+            entry.flapping = True
+            return Alert(url, FLAPPING,
+                         detail=f"{len(transitions)} state changes, alerts paused")
+        if entry.flapping:
+            # Quiet long enough to fall under the limit: report the state it settled in.
+            entry.flapping = False
+        return Alert(url, kind)
+
+
+class AlertDispatcher:
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, sender=SENDER, recipients=None,
+                 username=None, password=None, starttls=True,
+                 digest_interval=DIGEST_INTERVAL, max_digest=MAX_DIGEST, timeout=30):
+        """Start the dispatch thread; the SMTP connection opens on first send."""
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = list(recipients or RECIPIENTS)
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.digest_interval = digest_interval
+        self.max_digest = max_digest
+        self.timeout = timeout
+        self.queue = queue.Queue()
+        ALERT_QUEUE.set_function(self.queue.qsize)
+        self.emails_sent = 0
+        self.connections_opened = 0
+        self.failures = 0
+        self._smtp = None
+        self._last_used = 0.0
+        self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+        self._thread.start()
+
+    def send(self, alert):
+        """Queue an alert for the next digest; returns immediately."""
+        ALERTS.labels(alert.kind).inc()
+        self.queue.put(alert)
+
+    def flush(self, timeout=None):
+        """Block until every alert queued so far has been sent (or dropped)."""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Send what's pending, then quit the SMTP session and stop."""
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        """Dispatch thread: gather alerts into digests and send them."""
+        pending = []
+        waiters = []
+        deadline = None
+        running = True
+        while running:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                running = False
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not None:
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.digest_interval
+
+            if pending:
+                due = not running or waiters or time.monotonic() >= deadline
+                # Full digests go out back to back, so an outage storm isn't
+                # spread over many intervals; only a partial one waits.
+                while len(pending) >= self.max_digest or (pending and due):
+                    batch, pending = pending[:self.max_digest], pending[self.max_digest:]
+                    self._send_digest(batch)
+                deadline = time.monotonic() + self.digest_interval if pending else None
+            if not pending:
+                for event in waiters:
+                    event.set()
+                waiters = []
+
+        for event in waiters:
+            event.set()
+        self._disconnect()
+
+    def _send_digest(self, batch):
+        """Send a batch of alerts, one digest per distinct recipient list."""
+        routes = {}
+        for alert in batch:
+            routes.setdefault(alert.recipients or tuple(self.recipients), []).append(alert)
+        for recipients, alerts in routes.items():
+            self._deliver(alerts, recipients)
+
+    def _deliver(self, alerts, recipients=None):
+        """Send one digest, reconnecting once if the session went stale."""
+        message = self.build_message(alerts, recipients)
+        for attempt in range(2):
+            try:
+                smtp = self._connection()
+                smtp.send_message(message)
+                self._last_used = time.monotonic()
+                self.emails_sent += 1
+                EMAILS.labels('sent').inc()
+                return
+            except (smtplib.SMTPException, OSError):
+                self._disconnect()
+        self.failures += 1
+        EMAILS.labels('failed').inc()
+
+    def build_message(self, alerts, recipients=None):
+        """Build the digest email for a list of alerts."""
+        counts = {}
+        for alert in alerts:
+            counts[alert.kind] = counts.get(alert.kind, 0) + 1
+        if len(alerts) == 1:
+            subject = f"ALERT: {alerts[0].url} is {alerts[0].kind}"
+        else:
+            summary = ', '.join(f"{n} {kind}" for kind, n in sorted(counts.items()))
+            subject = f"ALERT: {len(alerts)} uptime alerts ({summary})"
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = ', '.join(recipients or self.recipients)
+        message['Subject'] = subject
+        message.set_content('\n'.join(alert.line() for alert in alerts) + '\n')
+        return message
+
+    def _connection(self):
+        """Return the open SMTP session, reconnecting if needed."""
+        if self._smtp is not None and time.monotonic() - self._last_used > SMTP_IDLE_CHECK:
+            try:
+                if self._smtp.noop()[0] != 250:
+                    self._disconnect()
+            except (smtplib.SMTPException, OSError):
+                self._disconnect()
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+            except BaseException:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self.connections_opened += 1
+        return self._smtp
+
+    def _disconnect(self):
+        """Close the SMTP session, if any."""
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
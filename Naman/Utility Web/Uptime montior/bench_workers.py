@@ -0,0 +1,117 @@
+"""
+Benchmark - sweep throughput of the sharded workers vs. worker count.
+Starts a local HTTP stand-in (one asyncio server per core, sharing the
+port with SO_REUSEPORT), then sweeps the same set of URLs with 1, 2, 4 ...
+worker processes and prints probes per second for each.
+
+URLs point at distinct loopback addresses (127.0.x.y) so every worker
+sees many hosts, as it would against a real fleet.
+
+    python3 bench_workers.py --urls 5000 --max-workers 8
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import time
+
+from workers import Coordinator
+
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Length: 2\r\n"
+    b"Content-Type: text/plain\r\n\r\n"
+    b"ok"
+)
+
+
+async def _serve(conn_reader, conn_writer):
+    """Answer every request on a keep-alive connection with a tiny 200."""
+    try:
+        while True:
+            line = await conn_reader.readline()
+            if not line:
+                break
+            while line not in (b'\r\n', b'\n', b''):
+                line = await conn_reader.readline()
+            conn_writer.write(RESPONSE)
+            await conn_writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        conn_writer.close()
+
+
+def server_main(port):
+    """One stand-in server process."""
+    async def run():
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(('0.0.0.0', port))
+        server = await asyncio.start_server(_serve, sock=sock, backlog=4096)
+        await server.serve_forever()
+    asyncio.run(run())
+
+
+def free_port():
+    """Pick an unused TCP port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def discard_result(result):
+    """Sink handler for the benchmark: results aren't stored."""
+
+
+def bench(urls, workers, rounds):
+    """Probes per second for one worker count (best of rounds)."""
+    coordinator = Coordinator(workers=workers, handler=discard_result, closer=None,
+                              engine_options={'concurrency': 200})
+    coordinator.start()
+    try:
+        coordinator.sweep(urls[:workers * 50])     # warm up processes and pools
+        best = 0.0
+        for _ in range(rounds):
+            start = time.perf_counter()
+            done = coordinator.sweep(urls)
+            best = max(best, done / (time.perf_counter() - start))
+        return best
+    finally:
+        coordinator.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--urls', type=int, default=5000)
+    parser.add_argument('--max-workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--servers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    port = free_port()
+    servers = [multiprocessing.Process(target=server_main, args=(port,), daemon=True)
+               for _ in range(args.servers)]
+    for process in servers:
+        process.start()
+    time.sleep(0.5)
+
+    urls = [f"http://127.0.{i // 250}.{i % 250 + 1}:{port}/{i}" for i in range(args.urls)]
+    print(f"{args.urls} URLs, {args.servers} server processes, "
+          f"{multiprocessing.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'probes/s':>12} {'speedup':>8}")
+    workers, baseline = 1, None
+    while workers <= args.max_workers:
+        rate = bench(urls, workers, args.rounds)
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>12.0f} {rate / baseline:>7.2f}x")
+        workers *= 2
+
+    for process in servers:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Breakers - per-host circuit breakers for the probe engine.
+After a run of connection failures (timeouts, refused connections, DNS
+errors) a host's breaker opens: its probes are answered straight away as
+down instead of waiting out the full timeout. While open, one canary
+probe is let through every canary interval; if it gets a response the
+breaker closes and normal probing resumes, otherwise the interval doubles
+up to a cap. A host that answers with an HTTP error is reachable and never
+trips its breaker.
+"""
+
+import time
+
+from metrics import Counter, Gauge
+
+FAILURE_THRESHOLD = 5       # consecutive connection failures before a breaker opens
+CANARY_INTERVAL = 30        # seconds between canary probes of an open host
+MAX_CANARY_INTERVAL = 300   # longest gap between canaries
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'     # a canary is in flight
+
+SHORT_CIRCUITS = Counter('uptime_breaker_short_circuits_total',
+                         'Probes answered as down without touching an open host')
+TRANSITIONS = Counter('uptime_breaker_transitions_total', 'Breaker state changes, by new state',
+                      ['state'])
+OPEN_BREAKERS = Gauge('uptime_breakers_open', 'Hosts whose breaker is open or half-open')
+
+
+class Breaker:
+    def __init__(self):
+        """State for one host."""
+        self.state = CLOSED
+        self.failures = 0
+        self.interval = 0       # current canary interval
+        self.next_canary = 0.0
+
+
+class BreakerBoard:
+    def __init__(self, threshold=FAILURE_THRESHOLD, canary_interval=CANARY_INTERVAL,
+                 max_canary_interval=MAX_CANARY_INTERVAL, clock=time.monotonic):
+        """Breakers for every host an engine talks to, created on first use."""
+        self.threshold = threshold
+        self.canary_interval = canary_interval
+        self.max_canary_interval = max_canary_interval
+        self.clock = clock
+        self.breakers = {}
+        OPEN_BREAKERS.set_function(self.open_count)
+
+    def state(self, host):
+        breaker = self.breakers.get(host)
+        return breaker.state if breaker else CLOSED
+
+    def open_count(self):
+        return sum(1 for b in self.breakers.values() if b.state != CLOSED)
+
+    def allow(self, host):
+        """True if a probe of host should run (closed, or it's the canary's turn)."""
+        breaker = self.breakers.get(host)
+        if breaker is None or breaker.state == CLOSED:
+            return True
+        if breaker.state == OPEN and self.clock() >= breaker.next_canary:
+            self._move(breaker, HALF_OPEN)
+            return True
+        SHORT_CIRCUITS.inc()
+        return False
+
+    def record(self, host, reachable):
+        """Report whether a probe that allow() let through reached the host."""
+        breaker = self.breakers.get(host)
+        if reachable:
+            if breaker is not None:
+                if breaker.state != CLOSED:
+                    self._move(breaker, CLOSED)
+                del self.breakers[host]
+            return
+        if breaker is None:
+            breaker = self.breakers[host] = Breaker()
+        breaker.failures += 1
+        if breaker.state == HALF_OPEN:
+            breaker.interval = min(breaker.interval * 2, self.max_canary_interval)
+            self._open(breaker)
+        elif breaker.state == CLOSED and breaker.failures >= self.threshold:
+            breaker.interval = self.canary_interval
+            self._open(breaker)
+
+    def _open(self, breaker):
+        breaker.next_canary = self.clock() + breaker.interval
+        self._move(breaker, OPEN)
+
+    def _move(self, breaker, state):
+        breaker.state = state
+        TRANSITIONS.labels(state).inc()
@@ -0,0 +1,289 @@
+"""
+Export - stream pings and rollups out of uptime.db, and availability reports.
+Rows are read with fetchmany() in fixed-size chunks and written as they
+arrive, so memory use stays flat however large the database is. The
+database is opened read-only; the monitor can keep writing meanwhile
+(WAL readers don't block the writer).
+
+    python3 export.py pings --start 2024-05-01 --end 2024-06-01 -o may.csv
+    python3 export.py pings --url https://google.com --format jsonl
+    python3 export.py rollups --level hour --format parquet -o hours.parquet
+    python3 export.py report --start 2024-05-01 --end 2024-06-01 --target 99.9
+
+Parquet output needs pyarrow (pip install pyarrow); CSV and JSON Lines
+use only the standard library.
+"""
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+from history import DEFAULT_PERCENTILES, LEVELS, UptimeHistory
+from results_store import (DB_PATH, INSERT_COLUMNS, REAL_COLUMNS, ROLLUP_COLUMNS, ROLLUP_LAYOUT,
+                           rollup_layout)
+
+CHUNK_SIZE = 10000      # rows fetched and written at a time
+FORMATS = ('csv', 'jsonl', 'parquet')
+REPORT_FORMATS = ('text', 'csv', 'jsonl')
+REPORT_DAYS = 30        # default report window
+
+ROLLUP_TABLES = {'minute': 'rollup_minute', 'hour': 'rollup_hour', 'day': 'rollup_day'}
+MIGRATE_HINT = "run the monitor once to migrate this database"
+
+
+def open_readonly(path=DB_PATH):
+    """Open an existing database without taking write locks or changing the schema."""
+    return sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+
+
+def table_columns(conn, table):
+    """Column names of table; empty if there's no such table."""
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+
+def ping_columns(conn):
+    """The INSERT_COLUMNS the pings table has; older databases lack the timings.
+
+    Read-only connections can't migrate, so exports take what is there.
+    """
+    existing = set(table_columns(conn, 'pings'))
+    if not existing:
+        raise SystemExit("the database has no pings table")
+    return [name for name in INSERT_COLUMNS if name in existing]
+
+
+def check_rollups(conn):
+    """Exit with a clear message unless the rollups are built with this layout."""
+    if rollup_layout(conn) != ROLLUP_LAYOUT:
+        raise SystemExit(f"the rollup tables are missing or out of date; {MIGRATE_HINT}")
+
+
+def _where(url_column, urls, time_column, start, end):
+    """WHERE clause and parameters for optional URL and time filters."""
+    clauses, params = [], []
+    if urls:
+        clauses.append(f'{url_column} IN ({", ".join("?" * len(urls))})')
+        params.extend(urls)
+    if start is not None:
+        clauses.append(f'{time_column} >= ?')
+        params.append(start)
+    if end is not None:
+        clauses.append(f'{time_column} < ?')
+        params.append(end)
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+
+def iter_chunks(conn, sql, params=(), chunk_size=CHUNK_SIZE):
+    """Yield lists of up to chunk_size rows from one query."""
+    cursor = conn.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+def ping_chunks(conn, urls=None, start=None, end=None, chunk_size=CHUNK_SIZE,
+                columns=INSERT_COLUMNS):
+    """Raw pings (columns, in INSERT_COLUMNS order by default) in chunks, oldest first."""
+    where, params = _where('url', urls, 'timestamp',
+                           start and start.isoformat(' '), end and end.isoformat(' '))
+    # A full dump reads in rowid order, which is insertion order, instead
+    # of walking the timestamp index. Filtered reads go through an index
+    # that groups rows by URL, so they have to sort.
+    order = ' ORDER BY timestamp' if start or end or urls else ''
+    sql = f'SELECT {", ".join(columns)} FROM pings{where}{order}'
+    return iter_chunks(conn, sql, params, chunk_size)
+
+
+def rollup_chunks(conn, level, urls=None, start=None, end=None, chunk_size=CHUNK_SIZE):
+    """Rows of one rollup table (url, bucket, counters...) in chunks."""
+    table = ROLLUP_TABLES[level]
+    fmt = {name: fmt for name, fmt, _ in LEVELS}[table]
+    where, params = _where('url', urls, 'bucket',
+                           start and start.strftime(fmt), end and end.strftime(fmt))
+    sql = f'SELECT url, bucket, {", ".join(ROLLUP_COLUMNS)} FROM {table}{where}'
+    return iter_chunks(conn, sql, params, chunk_size)
+
+
+# --- writers ------------------------------------------------------------
+
+def write_csv(out, columns, chunks):
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    count = 0
+    for rows in chunks:
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def write_jsonl(out, columns, chunks):
+    count = 0
+    for rows in chunks:
+        out.write(''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in rows))
+        count += len(rows)
+    return count
+
+
+def write_parquet(path, columns, chunks, types):
+    """One row group per chunk, so pyarrow never holds more than a chunk."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("parquet output needs pyarrow (pip install pyarrow)")
+    kinds = {'text': pa.string(), 'int': pa.int64(), 'real': pa.float64(),
+             'timestamp': pa.timestamp('us')}
+    schema = pa.schema([(name, kinds[types[name]]) for name in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in chunks:
+            arrays = []
+            for i, name in enumerate(columns):
+                values = [row[i] for row in rows]
+                if types[name] == 'timestamp':
+                    values = [datetime.fromisoformat(v) for v in values]
+                arrays.append(pa.array(values, type=schema.field(name).type))
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            count += len(rows)
+    return count
+
+
+def column_types(columns):
+    """Parquet column types for ping or rollup columns."""
+    types = {}
+    for name in columns:
+        if name in ('url', 'bucket'):
+            types[name] = 'text'
+        elif name == 'timestamp':
+            types[name] = 'timestamp'
+        elif name.endswith('_ms') or name in REAL_COLUMNS:
+            types[name] = 'real'
+        else:
+            types[name] = 'int'
+    return types
+
+
+def export(chunks, columns, fmt, output=None):
+    """Write chunks to output (a path, or stdout for None/'-'); returns rows written."""
+    if fmt == 'parquet':
+        if output in (None, '-'):
+            raise SystemExit("parquet output needs a file name (-o FILE)")
+        return write_parquet(output, columns, chunks, column_types(columns))
+    write = write_csv if fmt == 'csv' else write_jsonl
+    if output in (None, '-'):
+        return write(sys.stdout, columns, chunks)
+    with open(output, 'w', newline='', encoding='utf-8') as out:
+        return write(out, columns, chunks)
+
+
+# --- report -------------------------------------------------------------
+
+def report_urls(conn):
+    """Every URL that has rollup data."""
+    return [row[0] for row in conn.execute('SELECT DISTINCT url FROM rollup_day ORDER BY url')]
+
+
+def availability_report(conn, start, end, urls=None, target=99.9,
+                        percentiles=DEFAULT_PERCENTILES):
+    """Yield one dict per URL: checks, availability, SLA and latency percentiles.
+
+    Reads only rollup rows, so the cost depends on the number of URLs
+    and the shape of the window, not on how many pings were stored.
+    """
+    history = UptimeHistory(conn)
+    for url in urls or report_urls(conn):
+        row = history.sla(url, start, end, target)
+        for pct, value in history.latency_percentiles(url, start, end, percentiles).items():
+            row[f'p{pct}_ms'] = value
+        yield row
+
+
+def _fmt(value):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f'{value:.3f}'
+    return str(value)
+
+
+def write_report(rows, fmt, out):
+    """Print report rows as an aligned table, CSV or JSON Lines."""
+    rows = list(rows)   # one per URL
+    if not rows:
+        print("no data in that window", file=sys.stderr)
+        return
+    columns = list(rows[0])
+    if fmt in ('csv', 'jsonl'):
+        write = write_csv if fmt == 'csv' else write_jsonl
+        write(out, columns, [[[row[c] for c in columns] for row in rows]])
+        return
+    shown = ['url', 'checks', 'coverage', 'availability', 'met', 'downtime_seconds'] + \
+        [c for c in columns if c.startswith('p') and c.endswith('_ms')]
+    table = [shown] + [[_fmt(row[c]) for c in shown] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(shown))]
+    for line in table:
+        print('  '.join(cell.ljust(w) for cell, w in zip(line, widths)).rstrip(), file=out)
+
+
+def _date(text):
+    return datetime.fromisoformat(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--db', default=DB_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_filters(sub):
+        sub.add_argument('--url', action='append', help="only this URL (repeatable)")
+        sub.add_argument('--start', type=_date, help="ISO date/time, inclusive")
+        sub.add_argument('--end', type=_date, help="ISO date/time, exclusive")
+
+    pings = commands.add_parser('pings', help="export raw pings")
+    rollups = commands.add_parser('rollups', help="export a rollup table")
+    rollups.add_argument('--level', choices=ROLLUP_TABLES, default='hour')
+    for sub in (pings, rollups):
+        add_filters(sub)
+        sub.add_argument('--format', choices=FORMATS, default='csv')
+        sub.add_argument('-o', '--output', help="output file (default stdout)")
+        sub.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    report = commands.add_parser('report', help="availability report per URL")
+    add_filters(report)
+    report.add_argument('--target', type=float, default=99.9, help="SLA target in percent")
+    report.add_argument('--format', choices=REPORT_FORMATS, default='text')
+    args = parser.parse_args()
+
+    try:
+        conn = open_readonly(args.db)
+        if args.command != 'pings':
+            check_rollups(conn)
+        if args.command == 'report':
+            end = args.end or datetime.now()
+            start = args.start or end - timedelta(days=REPORT_DAYS)
+            write_report(availability_report(conn, start, end, args.url, args.target),
+                         args.format, sys.stdout)
+            return
+        if args.command == 'pings':
+            columns = ping_columns(conn)
+            chunks = ping_chunks(conn, args.url, args.start, args.end, args.chunk_size,
+                                 columns)
+        else:
+            columns = ['url', 'bucket'] + ROLLUP_COLUMNS
+            chunks = rollup_chunks(conn, args.level, args.url, args.start, args.end,
+                                   args.chunk_size)
+        count = export(chunks, columns, args.format, args.output)
+        print(f"exported {count} rows", file=sys.stderr)
+    except sqlite3.Error as e:
+        raise SystemExit(f"can't read {args.db}: {e}")
+    except BrokenPipeError:
+        pass    # e.g. piped into head
+
+
+if __name__ == "__main__":
+    main()
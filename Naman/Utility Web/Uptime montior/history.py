@@ -0,0 +1,202 @@
+"""
+Uptime History - availability, SLA and latency queries for uptime.db.
+Queries are answered from the rollup tables kept by results_store: a
+window is split into whole days, whole hours and leftover minutes, so
+the rows read depend on the window length, never on how much history
+the database holds.
+"""
+
+from datetime import datetime, timedelta
+
+from latency import summarize
+from results_store import DB_PATH, LATENCY_BOUNDS, ROLLUP_COLUMNS, connect
+
+# Coarsest first: (table, bucket format, bucket length)
+LEVELS = (
+    ('rollup_day', '%Y-%m-%d', timedelta(days=1)),
+    ('rollup_hour', '%Y-%m-%d %H', timedelta(hours=1)),
+    ('rollup_minute', '%Y-%m-%d %H:%M', timedelta(minutes=1)),
+)
+
+DEFAULT_PERCENTILES = (50, 95, 99)
+TIMING_COLUMNS = ('latency_ms', 'dns_ms', 'connect_ms', 'tls_ms', 'ttfb_ms')
+MINUTE = timedelta(minutes=1)
+
+
+def _floor(t, step):
+    """Round t down to a multiple of step (one minute, hour or day)."""
+    if step >= timedelta(days=1):
+        return t.replace(hour=0, minute=0, second=0, microsecond=0)
+    if step >= timedelta(hours=1):
+        return t.replace(minute=0, second=0, microsecond=0)
+    return t.replace(second=0, microsecond=0)
+
+
+def plan_ranges(start, end, level=0):
+    """Split [start, end) into (table, first, stop) ranges, coarsest first.
+
+    start and end are rounded down to the minute, the finest rollup.
+    """
+    table, _, step = LEVELS[level]
+    start, end = _floor(start, MINUTE), _floor(end, MINUTE)
+    if level == len(LEVELS) - 1:
+        return [(table, start, end)] if start < end else []
+    lo = _floor(start, step)
+    if lo < start:
+        lo += step
+    hi = _floor(end, step)
+    if lo >= hi:
+        return plan_ranges(start, end, level + 1)
+    return (plan_ranges(start, lo, level + 1) + [(table, lo, hi)]
+            + plan_ranges(hi, end, level + 1))
+
+
+def histogram_percentile(counts, pct, maximum=None):
+    """Estimate a percentile (ms) from latency histogram bucket counts.
+
+    maximum, the slowest latency recorded, caps the estimate: no
+    interpolation within the top bucket may go past what was seen.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    rank = pct / 100 * total
+    seen = 0
+    for i, n in enumerate(counts):
+        if n and seen + n >= rank:
+            lo = LATENCY_BOUNDS[i - 1] if i else 0
+            hi = LATENCY_BOUNDS[i] if i < len(LATENCY_BOUNDS) else maximum
+            if hi is None:
+                return float(lo)  # open-ended last bucket
+            if maximum is not None:
+                hi = min(hi, max(maximum, lo))
+            return lo + (hi - lo) * (rank - seen) / n
+        seen += n
+    return float(LATENCY_BOUNDS[-1] if maximum is None else maximum)
+
+
+class UptimeHistory:
+    def __init__(self, db=DB_PATH):
+        """Query a database path or an existing sqlite3 connection."""
+        self.conn = connect(db) if isinstance(db, str) else db
+        self._formats = {table: fmt for table, fmt, _ in LEVELS}
+        self._levels = {table: level for level, (table, _, _) in enumerate(LEVELS)}
+
+    def totals(self, url, start, end):
+        """Summed rollup counters (latency_max: the largest) for url over [start, end)."""
+        sums = [0] * len(ROLLUP_COLUMNS)
+        columns = ', '.join(f'MAX({name})' if name == 'latency_max' else f'SUM({name})'
+                            for name in ROLLUP_COLUMNS)
+        for table, lo, hi in plan_ranges(start, end):
+            fmt = self._formats[table]
+            row = self.conn.execute(
+                f'SELECT {columns} FROM {table} WHERE url = ? AND bucket >= ? AND bucket < ?',
+                (url, lo.strftime(fmt), hi.strftime(fmt)),
+            ).fetchone()
+            sums = [max(a, b or 0) if name == 'latency_max' else a + (b or 0)
+                    for name, a, b in zip(ROLLUP_COLUMNS, sums, row)]
+        return dict(zip(ROLLUP_COLUMNS, sums))
+
+    def coverage(self, url, start, end):
+        """(first, last) span of [start, end) that url has rollup data for, or None.
+
+        The span runs from the start of the earliest bucket to the end of
+        the latest one, narrowed to the finest table that still has rows
+        for those buckets, and is clipped to the window.
+        """
+        ranges = plan_ranges(start, end)
+        first = self._edge(url, ranges, 'MIN')
+        if first is None:
+            return None
+        last, step = self._edge(url, ranges[::-1], 'MAX')
+        return max(first[0], start), min(last + step, end)
+
+    def _edge(self, url, ranges, which):
+        """(bucket start, bucket length) of the MIN or MAX bucket over ranges."""
+        for table, lo, hi in ranges:
+            found = self._bucket(url, table, lo, hi, which)
+            if found is None:
+                continue
+            level = self._levels[table]
+            for finer in range(level + 1, len(LEVELS)):
+                bucket, step = found
+                narrower = self._bucket(url, LEVELS[finer][0], bucket, bucket + step, which)
+                if narrower is None:
+                    break   # past the finer table's retention
+                found = narrower
+            return found
+        return None
+
+    def _bucket(self, url, table, lo, hi, which):
+        fmt = self._formats[table]
+        bucket, = self.conn.execute(
+            f'SELECT {which}(bucket) FROM {table} WHERE url = ? AND bucket >= ? AND bucket < ?',
+            (url, lo.strftime(fmt), hi.strftime(fmt)),
+        ).fetchone()
+        if bucket is None:
+            return None
+        return datetime.strptime(bucket, fmt), LEVELS[self._levels[table]][2]
+
+    def availability(self, url, start, end):
+        """Percentage of successful checks in the window, or None if there were none."""
+        totals = self.totals(url, start, end)
+        checks = totals['up'] + totals['down']
+        return 100.0 * totals['up'] / checks if checks else None
+
+    def uptime(self, url, days=30, now=None):
+        """Availability over the last `days` days."""
+        end = now or datetime.now()
+        return self.availability(url, end - timedelta(days=days), end)
+
+    def latency_percentiles(self, url, start, end, percentiles=DEFAULT_PERCENTILES):
+        """Approximate latency percentiles in ms, e.g. {50: 80.0, 95: 240.0, 99: 900.0}."""
+        totals = self.totals(url, start, end)
+        counts = [totals[f'h{i}'] for i in range(len(LATENCY_BOUNDS) + 1)]
+        return {p: histogram_percentile(counts, p, totals['latency_max']) for p in percentiles}
+
+    def sla(self, url, start, end, target=99.9):
+        """Check the window against an availability target (percent).
+
+        Downtime is estimated from the share of failed checks, which
+        assumes checks were spread evenly over the part of the window that
+        has data (see coverage()). Stretches with no data at all are not
+        counted as downtime; 'coverage' reports how much of the window the
+        data spans, and the budget is for that span.
+        """
+        totals = self.totals(url, start, end)
+        checks = totals['up'] + totals['down']
+        window = (end - start).total_seconds()
+        span = self.coverage(url, start, end) if checks else None
+        covered = (span[1] - span[0]).total_seconds() if span else 0.0
+        availability = 100.0 * totals['up'] / checks if checks else None
+        budget = covered * (100.0 - target) / 100.0
+        downtime = covered * totals['down'] / checks if checks else 0.0
+        return {
+            'url': url,
+            'checks': checks,
+            'availability': availability,
+            'target': target,
+            'met': availability is not None and availability >= target,
+            'window_seconds': window,
+            'covered_seconds': covered,
+            'coverage': 100.0 * covered / window if window > 0 else None,
+            'downtime_budget_seconds': budget,
+            'downtime_seconds': downtime,
+            'budget_remaining_seconds': budget - downtime,
+            'avg_latency_ms': totals['latency_sum'] / totals['latency_count']
+                              if totals['latency_count'] else None,
+        }
+
+    def timing_summary(self, url, start, end, columns=TIMING_COLUMNS):
+        """Exact percentile summaries of each timing column from raw pings.
+
+        Returns {column: {'count', 'min', 'max', 'mean', 'p50', 'p95', 'p99'}}.
+        Only windows inside the raw retention period have data; use
+        latency_percentiles() for older history.
+        """
+        rows = self.conn.execute(
+            f'SELECT {", ".join(columns)} FROM pings '
+            'WHERE url = ? AND timestamp >= ? AND timestamp < ?',
+            (url, start.isoformat(' '), end.isoformat(' ')),
+        ).fetchall()
+        return {name: summarize(row[i] for row in rows) for i, name in enumerate(columns)}
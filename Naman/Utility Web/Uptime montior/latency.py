@@ -0,0 +1,97 @@
+"""
+Latency - percentile summaries and regression detection for probe timings.
+LatencyTracker keeps a short window of recent response times per URL and
+compares its median with a longer baseline, so a site that is getting
+slow can alert before it stops answering. Medians keep one-off spikes
+from raising alerts.
+"""
+
+from collections import deque
+
+from alerts import Alert, SLOW
+
+PERCENTILES = (50, 95, 99)
+RECENT_WINDOW = 20      # samples in the "now" window
+BASELINE_WINDOW = 200   # older samples the recent window is compared with
+MIN_BASELINE = 50       # samples needed before regressions are reported
+SLOWDOWN_FACTOR = 2.0   # recent median must be this many times the baseline median
+MIN_SLOWDOWN_MS = 100   # ... and at least this much slower in absolute terms
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * pct / 100
+    lo = int(rank)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (rank - lo)
+
+
+def summarize(values, percentiles=PERCENTILES):
+    """Return {'count', 'min', 'max', 'mean', 'p50', ...} for a list of numbers."""
+    values = sorted(v for v in values if v is not None)
+    summary = {'count': len(values)}
+    if values:
+        summary['min'] = values[0]
+        summary['max'] = values[-1]
+        summary['mean'] = sum(values) / len(values)
+    for pct in percentiles:
+        summary[f'p{pct}'] = percentile(values, pct)
+    return summary
+
+
+class UrlLatency:
+    def __init__(self):
+        """Empty recent and baseline windows."""
+        self.recent = deque()
+        self.baseline = deque()
+        self.baseline_p50 = None
+        self.slow = False
+
+
+class LatencyTracker:
+    def __init__(self, recent_window=RECENT_WINDOW, baseline_window=BASELINE_WINDOW,
+                 min_baseline=MIN_BASELINE, factor=SLOWDOWN_FACTOR,
+                 min_slowdown_ms=MIN_SLOWDOWN_MS):
+        """Track per-URL latency windows and flag regressions."""
+        self.recent_window = recent_window
+        self.baseline_window = baseline_window
+        self.min_baseline = min_baseline
+        self.factor = factor
+        self.min_slowdown_ms = min_slowdown_ms
+        self.urls = {}
+
+    def record(self, url, latency_ms):
+        """Add one sample; return a SLOW Alert when a regression starts."""
+        if latency_ms is None:
+            return None
+        entry = self.urls.get(url)
+        if entry is None:
+            entry = self.urls[url] = UrlLatency()
+
+        entry.recent.append(latency_ms)
+        if len(entry.recent) > self.recent_window:
+            entry.baseline.append(entry.recent.popleft())
+            if len(entry.baseline) > self.baseline_window:
+                entry.baseline.popleft()
+            entry.baseline_p50 = None
+        if len(entry.baseline) < self.min_baseline:
+            return None
+
+        if entry.baseline_p50 is None:
+            entry.baseline_p50 = percentile(sorted(entry.baseline), 50)
+        recent_p50 = percentile(sorted(entry.recent), 50)
+        slow = (recent_p50 >= entry.baseline_p50 * self.factor
+                and recent_p50 - entry.baseline_p50 >= self.min_slowdown_ms)
+        started = slow and not entry.slow
+        entry.slow = slow
+        if started:
+            return Alert(url, SLOW, detail=f"median {recent_p50:.0f} ms, "
+                                           f"baseline {entry.baseline_p50:.0f} ms")
+        return None
+
+    def summary(self, url):
+        """Percentile summary of the recent window for url."""
+        entry = self.urls.get(url)
+        return summarize(entry.recent if entry else [])
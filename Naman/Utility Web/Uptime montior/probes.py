@@ -0,0 +1,487 @@
+"""
+Probe Engine - asyncio HTTP checks for the uptime monitor.
+Checks many URLs at once over keep-alive connections pooled per host,
+with a cap on in-flight probes and a deadline for the whole sweep.
+
+Each probe returns a ProbeResult with the status code, body size and
+DNS / connect / TLS / time-to-first-byte / total timings in ms.
+
+Probe modes, set per URL, trade detail for bandwidth:
+    get    full GET, body drained (the default, like requests.get)
+    head   HEAD request, no body; falls back to range if HEAD is refused
+    range  GET for the first byte only; large bodies are cut off unread
+    tcp    TCP connect only
+    tls    TCP connect plus TLS handshake (certificate checked), no request
+Pooled connections live as long as the engine, so a long-running engine
+reuses them across sweeps.
+"""
+
+import asyncio
+import ssl
+import time
+from collections import namedtuple
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+
+from breakers import FAILURE_THRESHOLD, BreakerBoard
+from metrics import Counter, Gauge, Histogram
+from resolver import DNS_TTL, DnsCache
+
+DEFAULT_CONCURRENCY = 100   # probes in flight at once
+DEFAULT_TIMEOUT = 10        # seconds per probe (same as the old requests.get)
+DEFAULT_SWEEP_DEADLINE = 60 # seconds for a whole sweep
+MAX_IDLE_PER_HOST = 4       # keep-alive connections kept per host
+MAX_REDIRECTS = 5
+READ_CHUNK = 64 * 1024
+USER_AGENT = "uptime-monitor/1.0"
+
+MODE_GET = 'get'
+MODE_HEAD = 'head'
+MODE_RANGE = 'range'
+MODE_TCP = 'tcp'
+MODE_TLS = 'tls'
+MODES = (MODE_GET, MODE_HEAD, MODE_RANGE, MODE_TCP, MODE_TLS)
+
+PROBES = Counter('uptime_probes_total', 'Probes finished, by mode and outcome',
+                 ['mode', 'outcome'])
+PROBE_SECONDS = Histogram('uptime_probe_duration_seconds', 'Total probe time', ['mode'])
+PROBES_IN_FLIGHT = Gauge('uptime_probes_in_flight', 'Probes currently running')
+SWEEP_TIMEOUTS = Counter('uptime_sweep_deadline_total',
+                         'Probes cancelled because their sweep ran out of time')
+CONNECTIONS_REUSED = Counter('uptime_connections_reused_total',
+                             'Probes served over a pooled keep-alive connection')
+EARLY_CLOSE_BYTES = 16 * 1024   # range mode drains bodies up to this size to keep the connection
+
+# Timing fields are in ms and None when that phase never ran (e.g. no
+# DNS lookup or handshake on a reused keep-alive connection).
+ProbeResult = namedtuple('ProbeResult', [
+    'url', 'up', 'status_code', 'timestamp',
+    'dns_ms', 'connect_ms', 'tls_ms', 'ttfb_ms', 'total_ms',
+    'body_bytes', 'redirects', 'reused', 'error', 'mode',
+], defaults=[None, None, None, None, None, None, None, 0, 0, False, None, MODE_GET])
+
+Response = namedtuple('Response', 'status headers keep_alive body_bytes')
+
+TIMING_FIELDS = ('dns_ms', 'connect_ms', 'tls_ms', 'ttfb_ms')
+
+
+class ProbeError(Exception):
+    """Raised when a server sends something we can't use as a response."""
+
+
+class HostPool:
+    """Idle keep-alive connections to one (scheme, host, port)."""
+
+    def __init__(self, max_idle=MAX_IDLE_PER_HOST):
+        self.idle = []
+        self.max_idle = max_idle
+
+    def get(self):
+        """Return an idle (reader, writer) pair, or None if there isn't one."""
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    def put(self, reader, writer):
+        """Hand a connection back for reuse, closing it if the pool is full."""
+        if len(self.idle) < self.max_idle and not writer.is_closing():
+            self.idle.append((reader, writer))
+        else:
+            writer.close()
+
+    def close(self):
+        """Close every idle connection."""
+        while self.idle:
+            _, writer = self.idle.pop()
+            writer.close()
+
+
+def _ms(since):
+    """Milliseconds elapsed since a perf_counter() reading."""
+    return (time.perf_counter() - since) * 1000
+
+
+class ProbeEngine:
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                 sweep_deadline=DEFAULT_SWEEP_DEADLINE, max_redirects=MAX_REDIRECTS,
+                 default_mode=MODE_GET, modes=None, dns_ttl=DNS_TTL,
+                 breaker_threshold=FAILURE_THRESHOLD, dns_cache=None):
+        """Set up the engine; connections are opened lazily per host.
+
+        modes maps URLs to a probe mode; other URLs use default_mode.
+        Use set_expected() for URLs that should answer something besides 200.
+        Lookups are cached for dns_ttl seconds (or in the DnsCache passed
+        as dns_cache); hosts that fail breaker_threshold probes in a row
+        get only a periodic canary probe until they answer again (None
+        turns circuit breaking off).
+        """
+        self.timeout = timeout
+        self.sweep_deadline = sweep_deadline
+        self.max_redirects = max_redirects
+        self.default_mode = default_mode
+        self.modes = {}
+        for url, mode in (modes or {}).items():
+            self.set_mode(url, mode)
+        self.expected = {}
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.pools = {}
+        self.no_head = set()    # hosts that refused HEAD; probed with range instead
+        self.ssl_context = ssl.create_default_context()
+        self.dns = dns_cache or DnsCache(ttl=dns_ttl)
+        self.breakers = None if breaker_threshold is None else BreakerBoard(breaker_threshold)
+
+    def set_mode(self, url, mode):
+        """Choose how url is probed (one of MODES); None restores the default."""
+        if mode is None:
+            self.modes.pop(url, None)
+        elif mode not in MODES:
+            raise ValueError(f"unknown probe mode {mode!r}; expected one of {MODES}")
+        else:
+            self.modes[url] = mode
+
+    def set_expected(self, url, statuses):
+        """Status codes that count as up for url; None or empty restores 200."""
+        if statuses:
+            self.expected[url] = frozenset(statuses)
+        else:
+            self.expected.pop(url, None)
+
+    async def probe(self, url, mode=None):
+        """Probe url and return a ProbeResult.
+
+        HTTP modes count as up on a 200 (206 for range), or on the codes
+        given to set_expected(), after redirects; tcp and tls count as up
+        when the connection or handshake succeeds.
+        """
+        mode = mode or self.modes.get(url, self.default_mode)
+        host = _breaker_key(url)
+        # URLs without a host get no breaker: they'd all share one, and a few
+        # bad ones would hide each other's real errors behind "circuit open".
+        breakers = self.breakers if host is not None else None
+        if breakers is not None and not breakers.allow(host):
+            PROBES.labels(mode, 'short-circuit').inc()
+            return ProbeResult(url, False, timestamp=datetime.now(), error='circuit open',
+                               mode=mode)
+        reachable = False
+        try:
+            async with self.semaphore:
+                PROBES_IN_FLIGHT.inc()
+                try:
+                    result = await self._probe(url, mode)
+                finally:
+                    PROBES_IN_FLIGHT.dec()
+            # Any HTTP answer, even an error status, means the host is alive.
+            reachable = result.error is None or result.status_code is not None
+            return result
+        finally:
+            if breakers is not None:
+                breakers.record(host, reachable)
+
+    async def _probe(self, url, mode):
+        """One probe, run while holding a concurrency slot."""
+        timestamp = datetime.now()
+        start = time.perf_counter()
+        info = {'redirects': 0, 'reused': False, 'mode': mode}
+        try:
+            if mode in (MODE_TCP, MODE_TLS):
+                await asyncio.wait_for(self._handshake(url, info), self.timeout)
+                return self._result(url, timestamp, start, info, up=True)
+            response = await asyncio.wait_for(self._fetch(url, info), self.timeout)
+        except asyncio.TimeoutError:
+            return self._result(url, timestamp, start, info, error='timeout')
+        except (OSError, EOFError, ProbeError, ValueError) as e:
+            return self._result(url, timestamp, start, info,
+                                error=f"{type(e).__name__}: {e}")
+        expected = self.expected.get(url, (200,))
+        up = response.status in expected or (
+            response.status == 206 and info['mode'] == MODE_RANGE and 200 in expected)
+        return self._result(url, timestamp, start, info, response=response, up=up)
+
+    def _result(self, url, timestamp, start, info, response=None, up=False, error=None):
+        """Build a ProbeResult from the timings gathered in info and count it."""
+        total_ms = _ms(start)
+        mode = info['mode']
+        PROBES.labels(mode, 'up' if up else ('error' if error else 'down')).inc()
+        PROBE_SECONDS.labels(mode).observe(total_ms / 1000)
+        if info['reused']:
+            CONNECTIONS_REUSED.inc()
+        return ProbeResult(
+            url=url,
+            up=up,
+            status_code=response.status if response else None,
+            timestamp=timestamp,
+            total_ms=total_ms,
+            body_bytes=response.body_bytes if response else 0,
+            error=error,
+            **info,
+        )
+
+    async def sweep(self, urls):
+        """Probe every url concurrently and return {url: ProbeResult}.
+
+        Probes still running when the sweep deadline passes are cancelled
+        and reported as down, so one stuck host can't hold up the rest.
+        """
+        started = datetime.now()
+        tasks = {url: asyncio.ensure_future(self.probe(url)) for url in dict.fromkeys(urls)}
+        if not tasks:
+            return {}
+        _, pending = await asyncio.wait(tasks.values(), timeout=self.sweep_deadline)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        results = {}
+        for url, task in tasks.items():
+            if task.cancelled():
+                SWEEP_TIMEOUTS.inc()
+                results[url] = ProbeResult(url, False, timestamp=started,
+                                           total_ms=self.sweep_deadline * 1000,
+                                           error='sweep deadline')
+            else:
+                results[url] = task.result()
+        return results
+
+    async def close(self):
+        """Close all pooled connections."""
+        for pool in self.pools.values():
+            pool.close()
+        self.pools.clear()
+        await asyncio.sleep(0)
+
+    async def _fetch(self, url, info):
+        """Request url in info['mode'], following redirects; return the final Response.
+
+        Phase timings in info describe the last hop.
+        """
+        for hop in range(self.max_redirects + 1):
+            info['redirects'] = hop
+            if info['mode'] == MODE_HEAD and _host_key(url) in self.no_head:
+                info['mode'] = MODE_RANGE
+            response = await self._request(url, info)
+            if info['mode'] == MODE_HEAD and response.status in (405, 501):
+                # Some servers refuse HEAD; remember the host and ask for one byte instead.
+                self.no_head.add(_host_key(url))
+                info['mode'] = MODE_RANGE
+                response = await self._request(url, info)
+            location = response.headers.get('location')
+            if response.status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            return response
+        raise ProbeError(f"too many redirects for {url}")
+
+    async def _handshake(self, url, info):
+        """tcp/tls modes: open a fresh connection, then close it unused."""
+        parts = _split(url)
+        secure = info['mode'] == MODE_TLS
+        if secure and parts.scheme != 'https' and parts.port is None:
+            port = 443
+        else:
+            port = parts.port or (443 if parts.scheme == 'https' else 80)
+        for field in TIMING_FIELDS:
+            info[field] = None
+        _, writer = await self._connect(parts.hostname, port, secure, info)
+        writer.close()
+
+    async def _connect(self, host, port, secure, info):
+        """Resolve (through the DNS cache), connect and (for https) handshake,
+        timing each phase."""
+        start = time.perf_counter()
+        addresses = await self.dns.resolve(host, port)
+        info['dns_ms'] = _ms(start)
+
+        start = time.perf_counter()
+        error = OSError(f"no addresses for {host}")
+        for family, _, _, _, address in addresses:
+            try:
+                reader, writer = await asyncio.open_connection(
+                    address[0], address[1], family=family)
+                break
+            except OSError as e:
+                error = e
+        else:
+            self.dns.invalidate(host, port)
+            raise error
+        info['connect_ms'] = _ms(start)
+
+        if secure:
+            start = time.perf_counter()
+            try:
+                await writer.start_tls(self.ssl_context, server_hostname=host)
+            except BaseException:
+                writer.close()
+                raise
+            info['tls_ms'] = _ms(start)
+        return reader, writer
+
+    async def _request(self, url, info):
+        """Send one request over a pooled connection and read the response."""
+        parts = _split(url)
+        secure = parts.scheme == 'https'
+        port = parts.port or (443 if secure else 80)
+        pool = self.pools.setdefault(_host_key(url), HostPool())
+
+        mode = info['mode']
+        method = 'HEAD' if mode == MODE_HEAD else 'GET'
+        host_header = parts.hostname if parts.port is None else f"{parts.hostname}:{port}"
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        extra = "Range: bytes=0-0\r\n" if mode == MODE_RANGE else ""
+        request = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {host_header}\r\n"
+            f"User-Agent: {USER_AGENT}\r\n"
+            "Accept: */*\r\n"
+            f"{extra}"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode('latin-1')
+        max_body = EARLY_CLOSE_BYTES if mode == MODE_RANGE else None
+
+        conn = pool.get()
+        reused = conn is not None
+        while True:
+            for field in TIMING_FIELDS:
+                info[field] = None
+            info['reused'] = reused
+            if conn is None:
+                conn = await self._connect(parts.hostname, port, secure, info)
+            reader, writer = conn
+            try:
+                sent = time.perf_counter()
+                writer.write(request)
+                await writer.drain()
+                response = await read_response(reader, method, info, sent, max_body)
+            except (OSError, EOFError, ProbeError, ValueError):
+                writer.close()
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection; retry fresh.
+                conn, reused = None, False
+                continue
+            except BaseException:
+                writer.close()
+                raise
+            if response.keep_alive:
+                pool.put(reader, writer)
+            else:
+                writer.close()
+            return response
+
+
+async def read_response(reader, method, info=None, sent=None, max_body=None):
+    """Read a response head and drain its body.
+
+    Header names are lower-cased. If info and sent (a perf_counter()
+    reading taken when the request went out) are given, the time to the
+    first response byte is stored as info['ttfb_ms']. With max_body set,
+    a body that is longer (or of unknown length) is left unread and the
+    response is marked not keep-alive, so the caller drops the connection
+    instead of downloading it.
+    """
+    status_line = await reader.readline()
+    if info is not None and sent is not None:
+        info['ttfb_ms'] = _ms(sent)
+    if not status_line:
+        raise ProbeError("connection closed before response")
+    fields = status_line.decode('latin-1').split(None, 2)
+    if len(fields) < 2 or not fields[0].startswith('HTTP/'):
+        raise ProbeError(f"bad status line: {status_line[:80]!r}")
+    version, status = fields[0], int(fields[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+    body_bytes = 0
+    length = headers.get('content-length')
+    if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+        pass
+    elif max_body is not None and (length is None or int(length) > max_body):
+        keep_alive = False
+    elif 'chunked' in headers.get('transfer-encoding', '').lower():
+        body_bytes = await _drain_chunked(reader)
+    elif length is not None:
+        body_bytes = await _drain(reader, int(length))
+    else:
+        # No length: the body runs until the server closes the connection.
+        while True:
+            chunk = await reader.read(READ_CHUNK)
+            if not chunk:
+                break
+            body_bytes += len(chunk)
+        keep_alive = False
+    return Response(status, headers, keep_alive, body_bytes)
+
+
+def _split(url):
+    """urlsplit() that rejects anything but http(s) URLs with a host."""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f"unsupported url: {url}")
+    return parts
+
+
+def _breaker_key(url):
+    """Host a probe's circuit breaker is kept under; None for unusable URLs."""
+    try:
+        return _host_key(url)
+    except ValueError:
+        return None
+
+
+def _host_key(url):
+    """(scheme, host, port) that connections to url are pooled under."""
+    parts = _split(url)
+    return (parts.scheme, parts.hostname,
+            parts.port or (443 if parts.scheme == 'https' else 80))
+
+
+async def _drain(reader, size):
+    """Read and discard exactly size bytes; returns size."""
+    remaining = size
+    while remaining > 0:
+        chunk = await reader.read(min(remaining, READ_CHUNK))
+        if not chunk:
+            raise EOFError("connection closed mid-body")
+        remaining -= len(chunk)
+    return size
+
+
+async def _drain_chunked(reader):
+    """Read and discard a chunked body, including trailers; returns its size."""
+    total = 0
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise EOFError("connection closed mid-body")
+        size = int(line.split(b';', 1)[0].strip(), 16)
+        if size == 0:
+            break
+        await _drain(reader, size + 2)
+        total += size
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            return total
+
+
+def run_sweep(urls, **options):
+    """Blocking helper: run one sweep on a fresh engine and return {url: ProbeResult}."""
+    async def _run():
+        engine = ProbeEngine(**options)
+        try:
+            return await engine.sweep(urls)
+        finally:
+            await engine.close()
+    return asyncio.run(_run())
@@ -0,0 +1,108 @@
+"""
+Resolver - in-process DNS cache shared by every probe of an engine.
+Lookups go through loop.getaddrinfo() once per host and port and are
+reused until they expire, so a sweep over many URLs on the same host
+resolves it once. Concurrent lookups of the same name share one request,
+and failed lookups are cached briefly so a dead domain isn't re-queried
+by every probe in a sweep.
+
+getaddrinfo() doesn't report record TTLs, so entries live for a fixed
+ttl (default 60s, below most public record TTLs); an entry is dropped as
+soon as every address in it refuses connections.
+"""
+
+import asyncio
+import socket
+import time
+
+from metrics import Counter, Gauge
+
+DNS_TTL = 60            # seconds a successful lookup is reused
+NEGATIVE_TTL = 10       # seconds a failed lookup is reused
+MAX_ENTRIES = 10000     # cached names at most; expired and oldest go first
+
+LOOKUPS = Counter('uptime_dns_lookups_total', 'DNS cache lookups, by outcome', ['outcome'])
+CACHED = Gauge('uptime_dns_cache_entries', 'Names held in the DNS cache')
+
+
+class DnsCache:
+    def __init__(self, ttl=DNS_TTL, negative_ttl=NEGATIVE_TTL, max_entries=MAX_ENTRIES,
+                 clock=time.monotonic):
+        """Empty cache; resolve() fills it."""
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = {}       # (host, port) -> (expires, addresses or exception)
+        self.pending = {}       # (host, port) -> future of a lookup in progress
+        CACHED.set_function(self.__len__)
+
+    def __len__(self):
+        return len(self.entries)
+
+    async def resolve(self, host, port):
+        """getaddrinfo() results for host:port, from the cache when fresh.
+
+        Raises the lookup's OSError (also while a failure is cached).
+        """
+        key = (host, port)
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if self.clock() < expires:
+                LOOKUPS.labels('hit').inc()
+                if isinstance(value, BaseException):
+                    raise value.with_traceback(None)
+                return value
+            del self.entries[key]
+
+        future = self.pending.get(key)
+        if future is not None:
+            LOOKUPS.labels('shared').inc()
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise           # this caller was cancelled
+                return await self.resolve(host, port)
+
+        loop = asyncio.get_running_loop()
+        future = self.pending[key] = loop.create_future()
+        try:
+            addresses = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            LOOKUPS.labels('error').inc()
+            self._store(key, self.negative_ttl, e)
+            future.set_exception(e)
+            future.exception()  # mark retrieved; waiters re-raise it themselves
+            raise
+        except BaseException:
+            # Cancelled mid-lookup: let a waiter (or the next probe) try again.
+            future.cancel()
+            raise
+        finally:
+            self.pending.pop(key, None)
+        LOOKUPS.labels('miss').inc()
+        self._store(key, self.ttl, addresses)
+        future.set_result(addresses)
+        return addresses
+
+    def invalidate(self, host, port):
+        """Forget host:port, e.g. after none of its addresses would connect."""
+        self.entries.pop((host, port), None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def _store(self, key, ttl, value):
+        """Cache value for ttl seconds, evicting if the cache is full."""
+        if ttl <= 0:
+            return
+        now = self.clock()
+        if len(self.entries) >= self.max_entries:
+            for old, (expires, _) in list(self.entries.items()):
+                if expires <= now:
+                    del self.entries[old]
+            while len(self.entries) >= self.max_entries:
+                del self.entries[next(iter(self.entries))]
+        self.entries[key] = (now + ttl, value)
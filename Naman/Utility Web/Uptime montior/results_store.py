@@ -0,0 +1,452 @@
+"""
+Results Store - batched SQLite writer for uptime pings.
+One background thread owns the database connection and writes queued
+pings in batched transactions, so probing never waits on disk. If the
+database fails (locked, disk full), the batch is retried on a reopened
+connection; one that still fails is dropped and counted, and the thread
+carries on with the next.
+
+Every batch also updates per-minute, per-hour and per-day rollup tables
+(up/down counts plus a latency histogram), so history queries read a
+bounded number of rollup rows instead of scanning raw pings.
+"""
+
+import bisect
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from metrics import Counter, Gauge, Histogram
+
+DB_PATH = 'uptime.db'
+BATCH_SIZE = 500        # rows per transaction
+FLUSH_INTERVAL = 1.0    # seconds before a partial batch is written
+COMPACT_INTERVAL = 3600 # seconds between retention passes
+RETRY_DELAYS = (0.5, 2.0, 5.0)  # seconds between retries of a failed batch
+
+# Retention in days; None keeps rows forever.
+RAW_RETENTION_DAYS = 7
+MINUTE_RETENTION_DAYS = 14
+HOUR_RETENTION_DAYS = 180
+DAY_RETENTION_DAYS = None
+
+# Upper bounds (ms) of the latency histogram buckets, 10% apart from 1 ms
+# to about 57 s, so a percentile read from them is off by at most 10%;
+# one more bucket catches everything slower than the last bound.
+LATENCY_GROWTH = 1.1
+LATENCY_BOUNDS = tuple(round(LATENCY_GROWTH ** i, 1) for i in range(116))
+HISTOGRAM_COLUMNS = [f"h{i}" for i in range(len(LATENCY_BOUNDS) + 1)]
+
+# (table, length of the ISO timestamp prefix that names the bucket)
+ROLLUPS = (
+    ('rollup_minute', 16),  # 'YYYY-MM-DD HH:MM'
+    ('rollup_hour', 13),    # 'YYYY-MM-DD HH'
+    ('rollup_day', 10),     # 'YYYY-MM-DD'
+)
+ROLLUP_COLUMNS = ['up', 'down', 'latency_count', 'latency_sum', 'latency_max'] + HISTOGRAM_COLUMNS
+REAL_COLUMNS = ('latency_sum', 'latency_max')
+# Recorded in the meta table once the rollups are built; any change to the
+# columns or bucket bounds makes connect() rebuild them from the raw pings.
+ROLLUP_LAYOUT = f"{','.join(ROLLUP_COLUMNS)};{','.join(map(str, LATENCY_BOUNDS))}"
+
+ROWS_WRITTEN = Counter('uptime_db_rows_written_total', 'Pings committed to the database')
+WRITE_SECONDS = Histogram('uptime_db_write_seconds', 'Time to commit one batch with its rollups',
+                          buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1))
+WRITE_ERRORS = Counter('uptime_db_write_errors_total',
+                       'Batches dropped because the database kept failing')
+WRITE_QUEUE = Gauge('uptime_db_queue_depth', 'Pings waiting for the writer thread')
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS pings (
+        url TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        timestamp TEXT NOT NULL,
+        latency_ms REAL,
+        status_code INTEGER,
+        dns_ms REAL,
+        connect_ms REAL,
+        tls_ms REAL,
+        ttfb_ms REAL,
+        body_bytes INTEGER
+    );
+'''
+
+META_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    ) WITHOUT ROWID;
+'''
+
+INDEXES = '''
+    CREATE INDEX IF NOT EXISTS idx_pings_url_timestamp ON pings (url, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_pings_timestamp ON pings (timestamp);
+'''
+
+# Columns added after the first release, for databases created earlier.
+# Probe metadata is kept as plain typed columns (NULL when unknown) rather
+# than a serialized blob, so exports and aggregates can read one column.
+PING_COLUMNS = {
+    'latency_ms': 'REAL',
+    'status_code': 'INTEGER',
+    'dns_ms': 'REAL',
+    'connect_ms': 'REAL',
+    'tls_ms': 'REAL',
+    'ttfb_ms': 'REAL',
+    'body_bytes': 'INTEGER',
+}
+INSERT_COLUMNS = ['url', 'status', 'timestamp'] + list(PING_COLUMNS)
+
+_STOP = object()
+
+
+def _rollup_schema(table):
+    """CREATE statement for one rollup table."""
+    counters = ',\n        '.join(
+        f"{name} {'REAL' if name in REAL_COLUMNS else 'INTEGER'} NOT NULL DEFAULT 0"
+        for name in ROLLUP_COLUMNS
+    )
+    return f'''
+    CREATE TABLE {table} (
+        url TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        {counters},
+        PRIMARY KEY (url, bucket)
+    ) WITHOUT ROWID;
+'''
+
+
+def _add_missing_columns(conn, table, columns):
+    """ALTER an older table so it has every column in columns."""
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    for name, decl in columns.items():
+        if name not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {decl}')
+
+
+def connect(path=DB_PATH):
+    """Open the database in WAL mode and make sure the schema exists."""
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    # With WAL, NORMAL only syncs at checkpoints, not on every commit.
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    _add_missing_columns(conn, 'pings', PING_COLUMNS)
+    conn.executescript(INDEXES)
+    conn.executescript(META_SCHEMA)
+    if rollup_layout(conn) != ROLLUP_LAYOUT:
+        rebuild_rollups(conn)
+    return conn
+
+
+def rollup_layout(conn):
+    """ROLLUP_LAYOUT of the rollups the database holds, or None if they were never built."""
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'rollup_layout'").fetchone()
+    except sqlite3.OperationalError:     # no meta table yet
+        return None
+    return row and row[0]
+
+
+def latency_bucket(latency_ms):
+    """Index of the histogram bucket a latency falls into."""
+    return bisect.bisect_left(LATENCY_BOUNDS, latency_ms)
+
+
+def aggregate(rows):
+    """Fold (url, status, timestamp, latency_ms, ...) ping rows into rollup deltas.
+
+    Returns {(table, url, bucket): [up, down, latency_count, latency_sum,
+    latency_max, h0, ...]}.
+    """
+    totals = {}
+    width = len(ROLLUP_COLUMNS)
+    for url, status, timestamp, latency, *_ in rows:
+        hist = None if latency is None else 5 + latency_bucket(latency)
+        for table, prefix in ROLLUPS:
+            key = (table, url, timestamp[:prefix])
+            acc = totals.get(key)
+            if acc is None:
+                acc = totals[key] = [0] * width
+            acc[0 if status else 1] += 1
+            if hist is not None:
+                acc[2] += 1
+                acc[3] += latency
+                if latency > acc[4]:
+                    acc[4] = latency
+                acc[hist] += 1
+    return totals
+
+
+def apply_rollups(conn, totals):
+    """Add aggregated deltas to the rollup tables (caller commits)."""
+    names = ', '.join(ROLLUP_COLUMNS)
+    marks = ', '.join('?' * (len(ROLLUP_COLUMNS) + 2))
+    updates = ', '.join(
+        f'{name} = MAX({name}, excluded.{name})' if name == 'latency_max'
+        else f'{name} = {name} + excluded.{name}'
+        for name in ROLLUP_COLUMNS
+    )
+    by_table = {}
+    for (table, url, bucket), acc in totals.items():
+        by_table.setdefault(table, []).append((url, bucket, *acc))
+    for table, params in by_table.items():
+        conn.executemany(
+            f'INSERT INTO {table} (url, bucket, {names}) VALUES ({marks}) '
+            f'ON CONFLICT (url, bucket) DO UPDATE SET {updates}',
+            params,
+        )
+
+
+def rebuild_rollups(conn, chunk_size=50000):
+    """Recreate every rollup table from the raw pings.
+
+    Dropping, creating, backfilling and recording ROLLUP_LAYOUT are one
+    transaction, so a crash part way leaves the old state (and the next
+    connect() tries again) rather than empty tables that look built.
+    """
+    # Explicit BEGIN: the sqlite3 module doesn't open a transaction for DDL.
+    conn.execute('BEGIN IMMEDIATE')
+    with conn:
+        for table, _ in ROLLUPS:
+            conn.execute(f'DROP TABLE IF EXISTS {table}')
+            conn.execute(_rollup_schema(table))
+        cursor = conn.execute('SELECT url, status, timestamp, latency_ms FROM pings')
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            apply_rollups(conn, aggregate(rows))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rollup_layout', ?)",
+                     (ROLLUP_LAYOUT,))
+
+
+def compact(conn, now=None, raw_days=RAW_RETENTION_DAYS,
+            minute_days=MINUTE_RETENTION_DAYS, hour_days=HOUR_RETENTION_DAYS,
+            day_days=DAY_RETENTION_DAYS):
+    """Delete raw pings and fine-grained rollups older than their retention.
+
+    Raw pings are already counted in the rollups, so dropping them only
+    loses per-probe detail: old history stays queryable at hour or day
+    resolution. Returns the number of rows deleted per table.
+    """
+    if now is None:
+        now = datetime.now()
+    plan = [('pings', 'timestamp', raw_days, None)]
+    plan += [
+        (table, 'bucket', days, prefix)
+        for (table, prefix), days in zip(ROLLUPS, (minute_days, hour_days, day_days))
+    ]
+    deleted = {}
+    with conn:
+        for table, column, days, prefix in plan:
+            if days is None:
+                continue
+            cutoff = (now - timedelta(days=days)).isoformat(' ')
+            if prefix is not None:
+                cutoff = cutoff[:prefix]
+            cursor = conn.execute(f'DELETE FROM {table} WHERE {column} < ?', (cutoff,))
+            deleted[table] = cursor.rowcount
+    return deleted
+
+
+class ResultsWriter:
+    def __init__(self, path=DB_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 compact_interval=COMPACT_INTERVAL, retention=None):
+        """Start the writer thread; it opens its own connection to path.
+
+        retention is passed to compact() as keyword arguments, e.g.
+        {'raw_days': 3}; set compact_interval to None to never compact.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.retention = retention or {}
+        self.queue = queue.Queue()
+        WRITE_QUEUE.set_function(self.queue.qsize)
+        self.rows_written = 0
+        self.batches_written = 0
+        self.batches_failed = 0 # dropped after every retry failed
+        self.rows_dropped = 0
+        self.error = None       # last sqlite3.Error the writer thread hit
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='results-writer', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._stopped:
+            raise self.error
+
+    def log(self, url, status, timestamp=None, latency_ms=None, status_code=None,
+            dns_ms=None, connect_ms=None, tls_ms=None, ttfb_ms=None, body_bytes=None):
+        """Queue one ping; returns immediately.
+
+        Raises RuntimeError once the writer has been closed.
+        """
+        if timestamp is None:
+            timestamp = datetime.now()
+        self._put((url, int(bool(status)), timestamp.isoformat(' '), latency_ms,
+                   status_code, dns_ms, connect_ms, tls_ms, ttfb_ms, body_bytes))
+
+    def log_probe(self, result):
+        """Queue a probes.ProbeResult with all of its timings."""
+        self.log(result.url, result.up, result.timestamp, result.total_ms,
+                 result.status_code, result.dns_ms, result.connect_ms, result.tls_ms,
+                 result.ttfb_ms, result.body_bytes)
+
+    def flush(self, timeout=None):
+        """Block until every ping queued so far has been committed.
+
+        Returns False on timeout. If a batch had to be dropped meanwhile
+        (the database kept failing), the error behind it is raised.
+        """
+        failed = self.batches_failed
+        done = threading.Event()
+        self._put(done)
+        finished = done.wait(timeout)
+        if self.batches_failed > failed:
+            raise self.error
+        return finished
+
+    def _put(self, item):
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("results writer is closed")
+            self.queue.put(item)
+
+    def close(self):
+        """Write whatever is left, then stop the thread and close the connection."""
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        """Writer thread: collect rows into batches and commit them."""
+        try:
+            conn = connect(self.path)
+        except sqlite3.Error as e:
+            self.error = e
+            self._stopped = True
+            self._ready.set()
+            return
+        self._ready.set()
+
+        batch = []
+        waiters = []
+        deadline = None
+        next_compact = None
+        if self.compact_interval is not None:
+            next_compact = time.monotonic()
+        running = True
+        try:
+            while running:
+                if next_compact is not None and time.monotonic() >= next_compact:
+                    conn = self._compact(conn)
+                    next_compact = time.monotonic() + self.compact_interval
+                wakeups = [t for t in (deadline, next_compact) if t is not None]
+                timeout = max(0.0, min(wakeups) - time.monotonic()) if wakeups else None
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is _STOP:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is not None:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                if batch and (not running or waiters or len(batch) >= self.batch_size
+                              or time.monotonic() >= deadline):
+                    conn = self._commit(conn, batch)
+                    batch = []
+                    deadline = None
+                if not batch:
+                    for event in waiters:
+                        event.set()
+                    waiters = []
+        finally:
+            # Whatever stopped the thread, nobody may be left waiting on it.
+            with self._lock:
+                self._stopped = True
+                waiters += self._drain()
+            for event in waiters:
+                event.set()
+            if conn is not None:
+                conn.close()
+
+    def _commit(self, conn, batch):
+        """Write a batch, reopening the database and retrying if it fails.
+
+        A busy or full database is often a passing problem, so the thread
+        never gives up for good: after the last retry the batch is dropped
+        and the next one starts afresh. Returns the connection to use next
+        (None if it couldn't be reopened).
+        """
+        for delay in RETRY_DELAYS + (None,):
+            try:
+                if conn is None:
+                    conn = connect(self.path)
+                self._write(conn, batch)
+                return conn
+            except sqlite3.Error as e:
+                self.error = e
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                if delay is not None:
+                    time.sleep(delay)
+        WRITE_ERRORS.inc()
+        self.batches_failed += 1
+        self.rows_dropped += len(batch)
+        return None
+
+    def _compact(self, conn):
+        """Run a retention pass; a failure waits for the next interval."""
+        try:
+            if conn is None:
+                conn = connect(self.path)
+            compact(conn, **self.retention)
+            return conn
+        except sqlite3.Error as e:
+            self.error = e
+            if conn is not None:
+                conn.close()
+            return None
+
+    def _drain(self):
+        """Empty the queue once the thread stops; returns the flush events in it."""
+        events = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return events
+            if isinstance(item, threading.Event):
+                events.append(item)
+
+    def _write(self, conn, batch):
+        """Insert a batch and its rollup deltas in one transaction."""
+        with WRITE_SECONDS.time(), conn:
+            conn.executemany(
+                f'INSERT INTO pings ({", ".join(INSERT_COLUMNS)}) '
+                f'VALUES ({", ".join("?" * len(INSERT_COLUMNS))})',
+                batch,
+            )
+            apply_rollups(conn, aggregate(batch))
+        ROWS_WRITTEN.inc(len(batch))
+        self.rows_written += len(batch)
+        self.batches_written += 1
@@ -0,0 +1,153 @@
+"""
+Scheduler - long-running per-URL check scheduling for the uptime monitor.
+Targets sit in a heap keyed by their next due time, so adding, removing
+or rescheduling a URL is O(log n). Check times get random jitter to
+spread load, hosts that keep failing back off exponentially, and a
+semaphore caps how many probes are in flight.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+
+from metrics import Gauge, Histogram
+
+DEFAULT_INTERVAL = 60   # seconds between checks of one URL
+JITTER = 0.1            # +/- fraction of the interval added to each check time
+MAX_IN_FLIGHT = 200     # probes running at once
+BACKOFF_AFTER = 3       # consecutive failures before checks slow down
+MAX_BACKOFF = 8         # longest delay, as a multiple of the URL's interval
+
+SCHEDULED = Gauge('uptime_scheduled_targets', 'URLs on the check schedule')
+LAG_SECONDS = Histogram('uptime_schedule_lag_seconds',
+                        'How late checks start after they come due (waiting for a slot)',
+                        buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60))
+
+
+class Target:
+    def __init__(self, url, interval):
+        """Scheduling state for one URL."""
+        self.url = url
+        self.interval = interval
+        self.failures = 0
+        self.generation = 0     # bumped to invalidate queued heap entries
+        self.in_flight = False
+        self.removed = False
+
+
+class Scheduler:
+    def __init__(self, engine, on_result, max_in_flight=MAX_IN_FLIGHT, jitter=JITTER,
+                 backoff_after=BACKOFF_AFTER, max_backoff=MAX_BACKOFF, clock=time.monotonic):
+        """Run engine.probe(url) for each target and pass results to on_result.
+
+        on_result(result) is called on the event loop and should not block.
+        """
+        self.engine = engine
+        self.on_result = on_result
+        self.jitter = jitter
+        self.backoff_after = backoff_after
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.targets = {}
+        self.heap = []
+        self.probes_started = 0
+        self._seq = itertools.count()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._wakeup = asyncio.Event()
+        self._tasks = set()
+        self._stopping = False
+        SCHEDULED.set_function(self.__len__)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def add(self, url, interval=DEFAULT_INTERVAL):
+        """Start checking url; the first check lands at a random point in one interval."""
+        if url in self.targets:
+            self.update(url, interval)
+            return
+        target = self.targets[url] = Target(url, interval)
+        self._push(target, self.clock() + random.uniform(0, interval))
+
+    def update(self, url, interval):
+        """Change a URL's interval; its next check is rescheduled to match."""
+        target = self.targets[url]
+        if interval == target.interval:
+            return
+        target.interval = interval
+        target.generation += 1
+        if not target.in_flight:
+            self._push(target, self.clock() + random.uniform(0, interval))
+
+    def remove(self, url):
+        """Stop checking url. A probe already running finishes normally."""
+        target = self.targets.pop(url, None)
+        if target is not None:
+            target.removed = True
+            target.generation += 1
+
+    def next_delay(self, target):
+        """Seconds until the target's next check, with backoff and jitter."""
+        delay = target.interval
+        extra = target.failures - self.backoff_after
+        if extra >= 0:
+            delay *= min(2 ** (extra + 1), self.max_backoff)
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def run(self):
+        """Dispatch probes as they come due until stop() is called."""
+        while not self._stopping:
+            if not self.heap:
+                await self._sleep(None)
+                continue
+            due, _, generation, target = self.heap[0]
+            delay = due - self.clock()
+            if delay > 0:
+                await self._sleep(delay)
+                continue
+            heapq.heappop(self.heap)
+            if target.removed or generation != target.generation:
+                continue  # stale entry left behind by update() or remove()
+            await self._slots.acquire()
+            LAG_SECONDS.observe(max(0.0, self.clock() - due))
+            target.in_flight = True
+            self.probes_started += 1
+            task = asyncio.ensure_future(self._check(target))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self):
+        """Ask run() to return once in-flight probes have finished."""
+        self._stopping = True
+        self._wakeup.set()
+
+    async def _check(self, target):
+        """Probe one target, report the result and queue its next check."""
+        try:
+            result = await self.engine.probe(target.url)
+            target.failures = 0 if result.up else target.failures + 1
+            self.on_result(result)
+        finally:
+            target.in_flight = False
+            self._slots.release()
+            if not target.removed:
+                self._push(target, self.clock() + self.next_delay(target))
+
+    def _push(self, target, due):
+        """Queue the target's next check and wake the loop if it's now first."""
+        heapq.heappush(self.heap, (due, next(self._seq), target.generation, target))
+        if self.heap[0][3] is target:
+            self._wakeup.set()
+
+    async def _sleep(self, timeout):
+        """Sleep until timeout passes or the heap changes."""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,189 @@
+"""
+Targets - file-driven registry of monitored URLs with hot reload.
+Targets come from a JSON, TOML or YAML file:
+
+    defaults:
+      interval: 60
+      mode: head
+      expect: [200]
+      alert: [ops@example.com]
+    targets:
+      - https://google.com
+      - url: https://example.com/health
+        interval: 15
+        mode: get
+        expect: [200, 204]
+
+The registry polls the file's mtime and size; when it changes the file is
+re-read and diffed against the old registry, so only added, removed or
+changed targets are touched. Probes already in flight are left alone.
+"""
+
+import asyncio
+import json
+import os
+from collections import namedtuple
+
+from probes import MODE_GET, MODES
+
+RELOAD_INTERVAL = 5     # seconds between mtime checks
+
+Target = namedtuple('Target', 'url interval mode expect alert')
+Diff = namedtuple('Diff', 'added removed changed')
+
+DEFAULTS = {
+    'interval': 60,
+    'mode': MODE_GET,
+    'expect': (200,),
+    'alert': (),
+}
+
+
+class TargetError(ValueError):
+    """Raised for a targets file that can't be used."""
+
+
+def _parse(path, data):
+    """Turn raw file bytes into Python objects based on the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.json':
+        return json.loads(data)
+    if ext == '.toml':
+        import tomllib
+        return tomllib.loads(data.decode('utf-8'))
+    if ext in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise TargetError("YAML target files need PyYAML (pip install pyyaml)")
+        loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+        try:
+            return yaml.load(data, Loader=loader)
+        except yaml.YAMLError as e:
+            raise TargetError(f"bad YAML in {path}: {e}")
+    raise TargetError(f"unknown targets file type: {path}")
+
+
+def _as_tuple(value):
+    """Accept a single value or a list, return a tuple."""
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    return (value,)
+
+
+def build_targets(config):
+    """Validate parsed config and return {url: Target}."""
+    if isinstance(config, list):
+        config = {'targets': config}
+    if not isinstance(config, dict):
+        raise TargetError("targets file must hold a mapping or a list")
+    defaults = dict(DEFAULTS)
+    defaults.update(config.get('defaults') or {})
+
+    targets = {}
+    for entry in config.get('targets') or []:
+        if isinstance(entry, str):
+            entry = {'url': entry}
+        url = entry.get('url')
+        if not url:
+            raise TargetError(f"target without a url: {entry!r}")
+        interval = entry.get('interval', defaults['interval'])
+        mode = entry.get('mode', defaults['mode'])
+        if mode not in MODES:
+            raise TargetError(f"{url}: unknown mode {mode!r}")
+        if not isinstance(interval, (int, float)) or interval <= 0:
+            raise TargetError(f"{url}: interval must be a positive number")
+        expect = _as_tuple(entry.get('expect', defaults['expect']))
+        if not all(isinstance(code, int) for code in expect):
+            raise TargetError(f"{url}: expect must be status codes")
+        alert = _as_tuple(entry.get('alert', defaults['alert']))
+        targets[url] = Target(url, interval, mode, expect, alert)
+    return targets
+
+
+def load_targets(path):
+    """Read a targets file and return {url: Target}."""
+    with open(path, 'rb') as f:
+        return build_targets(_parse(path, f.read()))
+
+
+def diff_targets(old, new):
+    """Compare two {url: Target} maps."""
+    added = [target for url, target in new.items() if url not in old]
+    removed = [url for url in old if url not in new]
+    changed = [target for url, target in new.items()
+               if url in old and old[url] != target]
+    return Diff(added, removed, changed)
+
+
+def apply_diff(scheduler, diff):
+    """Bring a Scheduler (and its engine) in line with a Diff."""
+    engine = scheduler.engine
+    for url in diff.removed:
+        scheduler.remove(url)
+        engine.set_mode(url, None)
+        engine.set_expected(url, None)
+    for target in diff.added + diff.changed:
+        engine.set_mode(target.url, target.mode)
+        engine.set_expected(target.url, target.expect)
+        scheduler.add(target.url, target.interval)
+
+
+class TargetRegistry:
+    def __init__(self, path, reload_interval=RELOAD_INTERVAL):
+        """Load path now; call check() (or run watch()) to pick up edits."""
+        self.path = path
+        self.reload_interval = reload_interval
+        self.targets = {}
+        self.subscribers = []
+        self.errors = 0
+        self._stamp = None
+        self.check()
+
+    def subscribe(self, callback):
+        """Call callback(diff, targets) after every reload that changed something.
+
+        The callback is called straight away with the current targets as
+        an all-added diff, so subscribers start in sync.
+        """
+        self.subscribers.append(callback)
+        if self.targets:
+            callback(diff_targets({}, self.targets), self.targets)
+
+    def check(self):
+        """Reload if the file changed; returns the Diff, or None if nothing changed.
+
+        A file that fails to parse keeps the previous targets in place.
+        """
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return None
+        try:
+            targets = load_targets(self.path)
+        except (OSError, ValueError) as e:
+            if not self.targets:
+                raise
+            self.errors += 1
+            print(f"targets: keeping previous config, {self.path} is invalid: {e}")
+            self._stamp = stamp
+            return None
+        self._stamp = stamp
+        diff = diff_targets(self.targets, targets)
+        self.targets = targets
+        if diff.added or diff.removed or diff.changed:
+            for callback in self.subscribers:
+                callback(diff, targets)
+            return diff
+        return None
+
+    async def watch(self):
+        """Poll the file forever (run as an asyncio task)."""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                self.check()
+            except OSError as e:
+                print(f"targets: can't read {self.path}: {e}")
@@ -1,38 +1,166 @@
 # uptime_monitor.py
-import requests
+import argparse
+import asyncio
+import atexit
 import sqlite3
-import smtplib
-from datetime import datetime
+import time
+
+from alerts import Alert, AlertDispatcher, AlertTracker
+from latency import LatencyTracker
+from metrics import Counter, start_http_server
+from probes import MODE_GET, MODES, ProbeEngine, run_sweep
+from results_store import ResultsWriter
+from scheduler import DEFAULT_INTERVAL, Scheduler
+from targets import TargetRegistry, apply_diff
+from workers import Coordinator
 
 def check_website(url):
-    try:
-        response = requests.get(url, timeout=10)
-        return response.status_code == 200
-    except:
-        return False
-
-def send_alert(url, status):
-    # Email alert logic
-    with smtplib.SMTP('smtp.gmail.com') as s:
-        s.sendmail(
-            "monitor@example.com",
-            "admin@example.com",
-            f"ALERT: {url} is DOWN!"
-        )
-
-def log_result(url, status):
-    conn = sqlite3.connect('uptime.db')
-    conn.execute('''
-        INSERT INTO pings 
-        (url, status, timestamp)
-        VALUES (?, ?, ?)
-    ''', (url, status, datetime.now()))
-    conn.commit()
+    return run_sweep([url])[url].up
+
+_dispatcher = None
+
+def get_dispatcher():
+    # Alerts go out as digests over one reused SMTP connection
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = AlertDispatcher('smtp.gmail.com')
+        atexit.register(_dispatcher.close)
+    return _dispatcher
+
+alert_routes = {}
+
+def update_routes(diff, targets=None):
+    # Per-URL alert recipients from the targets file (empty means the default list)
+    for url in diff.removed:
+        alert_routes.pop(url, None)
+    for target in diff.added + diff.changed:
+        alert_routes[target.url] = target.alert
+
+def send_alert(url, status, detail=''):
+    get_dispatcher().send(Alert(url, status, detail=detail, recipients=alert_routes.get(url)))
+
+_writer = None
+
+def get_writer():
+    # One connection for the whole run; rows are committed in batches
+    global _writer
+    if _writer is None:
+        _writer = ResultsWriter('uptime.db')
+        atexit.register(_writer.close)
+    return _writer
+
+def log_result(url, status, result=None):
+    # result is the full ProbeResult when we have one (timings, status code)
+    if result is not None:
+        get_writer().log_probe(result)
+    else:
+        get_writer().log(url, status)
 
 # Main monitoring loop
-urls = ["https://google.com", ...]
-for url in urls:
-    is_up = check_website(url)
-    log_result(url, is_up)
-    if not is_up:
-        send_alert(url, "DOWN")
+urls = ["https://google.com"]
+tracker = AlertTracker()
+latency = LatencyTracker()
+
+STORE_ERRORS = Counter('uptime_store_errors_total', 'Probe results that could not be stored')
+
+def handle_result(result):
+    # Called for every finished probe: store it, then alert on state changes
+    url, is_up = result.url, result.up
+    try:
+        log_result(url, is_up, result)
+    except (sqlite3.Error, RuntimeError):
+        # A storage problem must never stop alerting
+        STORE_ERRORS.inc()
+    alert = tracker.record(url, is_up)
+    slow = latency.record(url, result.total_ms) if is_up else None
+    for a in (alert, slow):
+        if a:
+            send_alert(url, a.kind, a.detail)
+
+def close_sinks():
+    # Flush pending pings and alerts (also run in the sink process); only
+    # sinks this process actually opened, so a coordinator starts none
+    if _writer is not None:
+        _writer.close()
+    if _dispatcher is not None:
+        _dispatcher.close()
+
+def monitor_sharded(workers, interval, mode=MODE_GET, targets_file=None, metrics_port=None):
+    # Spread URLs over worker processes; this process only coordinates
+    coordinator = Coordinator(workers, handler=handle_result, closer=close_sinks,
+                              engine_options={'default_mode': mode},
+                              on_targets=update_routes, metrics_port=metrics_port)
+    coordinator.start()
+    try:
+        if targets_file:
+            registry = TargetRegistry(targets_file)
+            registry.subscribe(lambda diff, targets: coordinator.set_targets(targets))
+            while True:
+                time.sleep(registry.reload_interval)
+                try:
+                    registry.check()
+                except OSError as e:
+                    print(f"targets: can't read {targets_file}: {e}")
+        else:
+            coordinator.add_targets(urls, interval)
+            while True:
+                time.sleep(3600)
+    finally:
+        coordinator.stop()
+
+async def monitor(interval, mode=MODE_GET, targets_file=None):
+    # Check every URL on its own jittered schedule until interrupted
+    engine = ProbeEngine(default_mode=mode)
+    scheduler = Scheduler(engine, handle_result)
+    watcher = None
+    if targets_file:
+        # Edits to the file reschedule only the targets that changed
+        registry = TargetRegistry(targets_file)
+        registry.subscribe(lambda diff, targets: apply_diff(scheduler, diff))
+        registry.subscribe(update_routes)
+        watcher = asyncio.ensure_future(registry.watch())
+    else:
+        for url in urls:
+            scheduler.add(url, interval)
+    try:
+        await scheduler.run()
+    finally:
+        if watcher:
+            watcher.cancel()
+        scheduler.stop()
+        await engine.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Website uptime monitor")
+    parser.add_argument('--once', action='store_true', help="run a single sweep and exit")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help="seconds between checks of each URL")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="shard URLs over this many worker processes")
+    parser.add_argument('--mode', choices=MODES, default=MODE_GET,
+                        help="how to probe each URL (head/range save bandwidth)")
+    parser.add_argument('--targets', metavar='FILE',
+                        help="JSON/TOML/YAML targets file, reloaded when it changes")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    args = parser.parse_args()
+    if args.metrics_port and not args.workers:
+        # Sharded runs serve metrics from the sink and each worker instead
+        start_http_server(args.metrics_port)
+    try:
+        if args.once:
+            # One concurrent sweep instead of a blocking request per URL
+            for result in run_sweep(urls, default_mode=args.mode).values():
+                handle_result(result)
+        elif args.workers:
+            monitor_sharded(args.workers, args.interval, args.mode, args.targets,
+                            args.metrics_port)
+        else:
+            asyncio.run(monitor(args.interval, args.mode, args.targets))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_sinks()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Workers - sharded multi-process monitoring for the uptime monitor.
+URLs are spread over N worker processes with a consistent-hash ring.
+Each worker runs its own probe engine and scheduler and ships results in
+batches to a single sink process, which is the only one that writes to
+the database. When workers are added or removed the coordinator moves
+only the URLs whose owner changed.
+
+Metrics live per process: with a metrics port P the sink serves /metrics
+on P and worker n on P + 1 + n.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import multiprocessing
+import signal
+import threading
+
+import metrics
+from probes import ProbeEngine
+from results_store import DB_PATH, ResultsWriter
+from scheduler import DEFAULT_INTERVAL, Scheduler
+from targets import DEFAULTS, Diff, Target, apply_diff, diff_targets
+
+REPLICAS = 100          # virtual nodes per worker on the hash ring
+RESULT_BATCH = 256      # results per message to the sink
+RESULT_FLUSH = 0.25     # seconds before a partial batch is sent
+
+
+def _hash(key):
+    """Stable 64-bit hash of a string (Python's hash() changes per process)."""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    def __init__(self, nodes=(), replicas=REPLICAS):
+        """Consistent-hash ring mapping keys to nodes."""
+        self.replicas = replicas
+        self.points = []    # sorted hashes
+        self.owners = []    # node at each point
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        """Place replicas of node on the ring."""
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            index = bisect.bisect(self.points, point)
+            self.points.insert(index, point)
+            self.owners.insert(index, node)
+
+    def remove(self, node):
+        """Take node off the ring."""
+        keep = [(p, n) for p, n in zip(self.points, self.owners) if n != node]
+        self.points = [p for p, _ in keep]
+        self.owners = [n for _, n in keep]
+
+    def node_for(self, key):
+        """Node that owns key."""
+        if not self.points:
+            raise LookupError("hash ring is empty")
+        index = bisect.bisect(self.points, _hash(key)) % len(self.points)
+        return self.owners[index]
+
+
+# --- sink process -------------------------------------------------------
+
+_writer = None
+
+def store_result(result):
+    """Default sink handler: write the probe to uptime.db."""
+    global _writer
+    if _writer is None:
+        _writer = ResultsWriter(DB_PATH)
+    _writer.log_probe(result)
+
+def close_store():
+    """Flush and close the default sink's writer."""
+    if _writer is not None:
+        _writer.close()
+
+
+def _serve_metrics(port):
+    """Start this process's /metrics server if a port was given."""
+    if port is not None:
+        metrics.start_http_server(port)
+
+
+def sink_main(results, handler, closer, on_targets=None, metrics_port=None):
+    """Sink process: pass every result batch to handler until told to stop.
+
+    ('targets', diff) messages are passed on as on_targets(diff, None), so
+    the sink can keep per-URL settings such as alert routing up to date.
+    """
+    # Ctrl-C reaches the whole process group; only the coordinator handles
+    # it, and its stop() drains this process through the None sentinel.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _serve_metrics(metrics_port)
+    try:
+        while True:
+            batch = results.get()
+            if batch is None:
+                break
+            if isinstance(batch, tuple):
+                if on_targets is not None:
+                    on_targets(batch[1], None)
+                continue
+            for result in batch:
+                handler(result)
+    finally:
+        if closer is not None:
+            closer()
+
+
+# --- worker process -----------------------------------------------------
+
+def worker_main(worker_id, commands, results, replies, engine_options, metrics_port=None):
+    """Worker process: probe the URLs it's been given."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # the coordinator stops us
+    _serve_metrics(metrics_port)
+    asyncio.run(_worker(worker_id, commands, results, replies, engine_options or {}))
+
+
+async def _worker(worker_id, commands, results, replies, engine_options):
+    loop = asyncio.get_running_loop()
+    engine = ProbeEngine(**engine_options)
+    outbox = []
+
+    def flush():
+        if outbox:
+            results.put(list(outbox))
+            outbox.clear()
+
+    def on_result(result):
+        outbox.append(result)
+        if len(outbox) >= RESULT_BATCH:
+            flush()
+
+    scheduler = Scheduler(engine, on_result)
+
+    async def sweep(urls):
+        for result in (await engine.sweep(urls)).values():
+            on_result(result)
+        flush()
+        replies.put(('swept', worker_id, len(urls)))
+
+    def apply(command):
+        kind, payload = command
+        if kind == 'add':
+            apply_diff(scheduler, Diff(payload, [], []))
+        elif kind == 'remove':
+            apply_diff(scheduler, Diff([], payload, []))
+        elif kind == 'sweep':
+            asyncio.ensure_future(sweep(payload))
+        elif kind == 'stop':
+            scheduler.stop()
+
+    def read_commands():
+        # Blocking queue reads happen off the event loop.
+        while True:
+            command = commands.get()
+            loop.call_soon_threadsafe(apply, command)
+            if command[0] == 'stop':
+                return
+
+    threading.Thread(target=read_commands, daemon=True).start()
+
+    async def flusher():
+        while True:
+            await asyncio.sleep(RESULT_FLUSH)
+            flush()
+
+    flushing = asyncio.ensure_future(flusher())
+    try:
+        await scheduler.run()
+    finally:
+        flushing.cancel()
+        flush()
+        await engine.close()
+        replies.put(('stopped', worker_id, len(scheduler)))
+
+
+# --- coordinator --------------------------------------------------------
+
+class Coordinator:
+    def __init__(self, workers=None, handler=store_result, closer=close_store,
+                 engine_options=None, on_targets=None, metrics_port=None):
+        """Plan a pool of worker processes feeding one sink process.
+
+        handler(result) runs in the sink for every probe result, closer()
+        when it shuts down and on_targets(diff, targets) when the target
+        set changes; all must be picklable (module-level functions).
+        metrics_port, if given, is where the sink serves /metrics; workers
+        use the ports after it.
+        """
+        self.initial_workers = workers or multiprocessing.cpu_count()
+        self.handler = handler
+        self.closer = closer
+        self.on_targets = on_targets
+        self.engine_options = engine_options or {}
+        self.metrics_port = metrics_port
+        self.ring = HashRing()
+        self.workers = {}       # id -> (process, command queue)
+        self.targets = {}       # url -> Target
+        self.owner = {}         # url -> worker id
+        self.results = multiprocessing.Queue()
+        self.replies = multiprocessing.Queue()
+        self.sink = None
+        self._next_id = 0
+
+    def start(self):
+        """Start the sink and the initial workers."""
+        self.sink = multiprocessing.Process(
+            target=sink_main,
+            args=(self.results, self.handler, self.closer, self.on_targets, self.metrics_port),
+            name='uptime-sink')
+        self.sink.start()
+        for _ in range(self.initial_workers):
+            self.add_worker()
+
+    def add_worker(self):
+        """Start one more worker and move its share of URLs to it."""
+        worker_id = self._next_id
+        self._next_id += 1
+        commands = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=worker_main,
+            args=(worker_id, commands, self.results, self.replies, self.engine_options,
+                  None if self.metrics_port is None else self.metrics_port + 1 + worker_id),
+            name=f'uptime-worker-{worker_id}')
+        process.start()
+        self.workers[worker_id] = (process, commands)
+        self.ring.add(worker_id)
+        self._rebalance()
+        return worker_id
+
+    def remove_worker(self, worker_id):
+        """Stop a worker and hand its URLs to the remaining ones."""
+        process, commands = self.workers.pop(worker_id)
+        self.ring.remove(worker_id)
+        commands.put(('stop', None))
+        process.join()
+        for url, owner in list(self.owner.items()):
+            if owner == worker_id:
+                del self.owner[url]
+        self._rebalance()
+
+    def add_targets(self, urls, interval=DEFAULT_INTERVAL):
+        """Start monitoring urls with default settings and the given interval."""
+        targets = dict(self.targets)
+        for url in urls:
+            targets[url] = Target(url, interval, DEFAULTS['mode'], DEFAULTS['expect'],
+                                  DEFAULTS['alert'])
+        self.set_targets(targets)
+
+    def remove_targets(self, urls):
+        """Stop monitoring urls."""
+        targets = dict(self.targets)
+        for url in urls:
+            targets.pop(url, None)
+        self.set_targets(targets)
+
+    def set_targets(self, targets):
+        """Replace the target set ({url: Target}); only the differences are sent."""
+        diff = diff_targets(self.targets, targets)
+        self.targets = dict(targets)
+        by_worker = {}
+        for url in diff.removed:
+            owner = self.owner.pop(url, None)
+            if owner is not None:
+                by_worker.setdefault(owner, []).append(url)
+        for worker_id, batch in by_worker.items():
+            self.workers[worker_id][1].put(('remove', batch))
+        changed = [target.url for target in diff.added + diff.changed]
+        for url in changed:
+            self.owner.pop(url, None)
+        self._rebalance(changed=changed)
+        if self.on_targets is not None and (diff.added or diff.removed or diff.changed):
+            self.results.put(('targets', diff))
+
+    def sweep(self, urls, timeout=None):
+        """Probe urls once, each on the worker that owns it; returns when all are done."""
+        by_worker = {}
+        for url in dict.fromkeys(urls):
+            by_worker.setdefault(self.ring.node_for(url), []).append(url)
+        for worker_id, batch in by_worker.items():
+            self.workers[worker_id][1].put(('sweep', batch))
+        waiting = set(by_worker)
+        done = 0
+        while waiting:
+            kind, worker_id, count = self.replies.get(timeout=timeout)
+            if kind == 'swept' and worker_id in waiting:
+                waiting.discard(worker_id)
+                done += count
+        return done
+
+    def stop(self):
+        """Stop every worker, then let the sink drain and exit."""
+        # A second Ctrl-C mustn't abandon the children halfway through.
+        previous = None
+        if threading.current_thread() is threading.main_thread():
+            previous = signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            for worker_id in list(self.workers):
+                process, commands = self.workers.pop(worker_id)
+                commands.put(('stop', None))
+                process.join()
+            if self.sink is not None:
+                self.results.put(None)
+                self.sink.join()
+                self.sink = None
+        finally:
+            if previous is not None:
+                signal.signal(signal.SIGINT, previous)
+
+    def _rebalance(self, changed=None):
+        """Send each URL whose owner changed to its new worker."""
+        if not self.workers:
+            return
+        adds, removes = {}, {}
+        for url in (self.targets if changed is None else changed):
+            new = self.ring.node_for(url)
+            old = self.owner.get(url)
+            if old == new:
+                continue
+            if old is not None:
+                removes.setdefault(old, []).append(url)
+            adds.setdefault(new, []).append(self.targets[url])
+            self.owner[url] = new
+        for worker_id, batch in removes.items():
+            self.workers[worker_id][1].put(('remove', batch))
+        for worker_id, batch in adds.items():
+            self.workers[worker_id][1].put(('add', batch))
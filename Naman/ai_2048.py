@@ -0,0 +1,246 @@
+"""
+2048 AI - expectimax player for game_2048
+Searches the game tree on the packed board from board_2048: the player
+picks the move with the best expected value, and every chance node
+averages over the tiles add_random_tile() could place (a 2 with
+probability 0.9, a 4 with 0.1, in any empty cell).
+
+- Leaves are scored by a heuristic that rewards empty cells, possible
+  merges and rows/columns that are monotonic, and penalises large tiles
+  scattered around. It is precomputed for all 65,536 rows, so a board is
+  scored with eight table lookups.
+- A transposition table caches chance-node values per search, since
+  different move orders often reach the same board.
+- Branches whose probability of being reached falls below
+  MIN_PROBABILITY are cut off and scored by the heuristic.
+- Search deepens one move at a time until the time budget runs out.
+
+    python3 ai_2048.py              # watch it play
+    python3 ai_2048.py --games 10 --quiet
+"""
+
+import argparse
+import random
+import time
+
+import board_2048
+from board_2048 import MOVES, ROW_MASK, move, transpose
+from game_2048 import Game2048
+
+TIME_BUDGET = 0.05          # seconds per move
+MAX_DEPTH = 6               # player moves looked ahead at most
+MIN_PROBABILITY = 0.0001    # chance branches less likely than this are not expanded
+FOUR_PROBABILITY = 0.1      # same odds as Game2048.add_random_tile
+
+# Heuristic weights (per row or column; tile "rank" is its exponent).
+LOST_PENALTY = 200000.0
+MONOTONICITY_POWER = 4
+MONOTONICITY_WEIGHT = 47.0
+SUM_POWER = 3.5
+SUM_WEIGHT = 11.0
+MERGES_WEIGHT = 700.0
+EMPTY_WEIGHT = 270.0
+
+
+def _row_heuristic(row):
+    """Heuristic value of one row (or column) of exponents."""
+    tiles = [(row >> 12) & 0xF, (row >> 8) & 0xF, (row >> 4) & 0xF, row & 0xF]
+    total = 0.0
+    empty = 0
+    merges = 0
+    previous = 0
+    counter = 0
+    for rank in tiles:
+        total += rank ** SUM_POWER
+        if rank == 0:
+            empty += 1
+        elif previous == rank:
+            counter += 1
+        else:
+            if counter > 0:
+                merges += 1 + counter
+            counter = 0
+            previous = rank
+    if counter > 0:
+        merges += 1 + counter
+
+    left = right = 0.0
+    for a, b in zip(tiles, tiles[1:]):
+        if a > b:
+            left += a ** MONOTONICITY_POWER - b ** MONOTONICITY_POWER
+        else:
+            right += b ** MONOTONICITY_POWER - a ** MONOTONICITY_POWER
+
+    return (LOST_PENALTY + EMPTY_WEIGHT * empty + MERGES_WEIGHT * merges
+            - MONOTONICITY_WEIGHT * min(left, right) - SUM_WEIGHT * total)
+
+
+# Heuristic value of every possible row
+ROW_SCORES = [_row_heuristic(row) for row in range(ROW_MASK + 1)]
+
+
+def heuristic(board):
+    """Score a position: the sum over its four rows and four columns."""
+    s = ROW_SCORES
+    t = transpose(board)
+    return (s[board >> 48] + s[(board >> 32) & ROW_MASK] + s[(board >> 16) & ROW_MASK]
+            + s[board & ROW_MASK] + s[t >> 48] + s[(t >> 32) & ROW_MASK]
+            + s[(t >> 16) & ROW_MASK] + s[t & ROW_MASK])
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class Expectimax:
+    def __init__(self, min_probability=MIN_PROBABILITY, max_depth=MAX_DEPTH):
+        """Expectimax searcher; reuse one for a whole game."""
+        self.min_probability = min_probability
+        self.max_depth = max_depth
+        self.nodes = 0          # positions visited by the last search
+        self.depth = 0          # deepest search completed by the last call
+        self._cache = {}
+        self._deadline = None
+
+    def best_move(self, board, time_budget=TIME_BUDGET, depth=None):
+        """Best direction for a packed board, or None if no move is possible.
+
+        Searches depth moves ahead if given, otherwise deepens until
+        time_budget seconds have been spent (always finishing depth 1).
+        """
+        moves = [(direction, after) for direction in MOVES
+                 for after in (move(board, direction)[0],) if after != board]
+        if not moves:
+            return None
+        if len(moves) == 1:
+            return moves[0][0]
+
+        self.nodes = 0
+        start = time.perf_counter()
+        best = moves[0][0]
+        depths = [depth] if depth else range(1, self.max_depth + 1)
+        for limit in depths:
+            self._cache = {}
+            self._deadline = None if depth or limit == 1 else start + time_budget
+            try:
+                values = [(self._chance(after, limit - 1, 1.0), direction)
+                          for direction, after in moves]
+            except _OutOfTime:
+                break
+            best = max(values)[1]
+            self.depth = limit
+            if depth is None:
+                spent = time.perf_counter() - start
+                # The next depth takes several times longer; don't start what can't finish.
+                if spent * 4 > time_budget:
+                    break
+        self._cache = {}
+        return best
+
+    def _chance(self, board, depth, probability):
+        """Expected value of a board right after the player's move."""
+        if depth == 0 or probability < self.min_probability:
+            return heuristic(board)
+        cached = self._cache.get(board)
+        if cached is not None and cached[0] >= depth:
+            return cached[1]
+
+        empties = [shift for shift in range(0, 64, 4) if not (board >> shift) & 0xF]
+        # A move always leaves at least one cell empty.
+        each = probability / len(empties)
+        two = each * (1 - FOUR_PROBABILITY)
+        four = each * FOUR_PROBABILITY
+        total = 0.0
+        for shift in empties:
+            total += (1 - FOUR_PROBABILITY) * self._max(board | (1 << shift), depth, two)
+            total += FOUR_PROBABILITY * self._max(board | (2 << shift), depth, four)
+        value = total / len(empties)
+        self._cache[board] = (depth, value)
+        return value
+
+    def _max(self, board, depth, probability):
+        """Value of the player's best move from board (0 if the game is lost)."""
+        self.nodes += 1
+        if self._deadline is not None and self.nodes & 0xFF == 0 \
+                and time.perf_counter() > self._deadline:
+            raise _OutOfTime
+        best = 0.0
+        for direction in MOVES:
+            after = move(board, direction)[0]
+            if after != board:
+                value = self._chance(after, depth - 1, probability)
+                if value > best:
+                    best = value
+        return best
+
+
+_searcher = Expectimax()
+
+
+def _check_size(game):
+    if game.size != board_2048.SIZE:
+        raise ValueError(f"the AI plays 4x4 boards, not {game.size}x{game.size}")
+
+
+def best_move(board, time_budget=TIME_BUDGET):
+    """Best direction (board_2048.LEFT/RIGHT/UP/DOWN) for a board, or None if stuck.
+
+    board is a packed int, a list-of-lists of tile values or a Game2048
+    (4x4 only).
+    """
+    if isinstance(board, Game2048):
+        _check_size(board)
+        board = board.bits
+    elif not isinstance(board, int):
+        board = board_2048.encode(board)
+    return _searcher.best_move(board, time_budget)
+
+
+def autoplay(game=None, time_budget=TIME_BUDGET, show=True, delay=0.0):
+    """Let the AI play a game to the end; returns (finished Game2048, moves made)."""
+    game = game or Game2048()
+    _check_size(game)
+    if not game.bits:
+        game.start()
+    searcher = Expectimax()
+    played = 0
+    while True:
+        if show:
+            game.print_board()
+            time.sleep(delay)
+        direction = searcher.best_move(game.bits, time_budget)
+        if direction is None:
+            break
+        game.step(direction)
+        played += 1
+    game.game_over = True
+    if show:
+        game.print_board()
+    return game, played
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--games', type=int, default=1)
+    parser.add_argument('--budget', type=float, default=TIME_BUDGET, help="seconds per move")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--quiet', action='store_true', help="don't draw the board")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    wins = 0
+    for number in range(1, args.games + 1):
+        start = time.perf_counter()
+        game, played = autoplay(time_budget=args.budget, show=not args.quiet)
+        elapsed = time.perf_counter() - start
+        top = 1 << board_2048.max_exponent(game.bits)
+        wins += game.won
+        print(f"game {number}: score {game.score}, max tile {top}, "
+              f"{played} moves, {played / elapsed:.0f} moves/s")
+    if args.games > 1:
+        print(f"reached 2048 in {wins}/{args.games} games")
+
+
+if __name__ == "__main__":
+    main()
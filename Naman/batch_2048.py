@@ -0,0 +1,253 @@
+"""
+2048 Batch - step and score many 2048 boards at once with NumPy
+N boards live in one (N, 4, 4) uint8 array of tile exponents (0 = empty,
+1 = 2, 2 = 4, ...). Moves reuse board_2048's row tables: every row is
+packed into a 16-bit index and slid with a single table lookup across
+the whole batch, so no Python code runs per board.
+
+    batch = BoardBatch(10000, seed=1)
+    while batch.alive().any():
+        batch.step_random()     # or batch.step(directions) with your own choices
+    print(batch.scores.mean(), batch.max_tiles().max())
+
+Running the file benchmarks random play against a loop over Game2048.
+Needs NumPy (pip install numpy).
+"""
+
+import argparse
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("batch_2048 needs NumPy (pip install numpy)")
+
+import board_2048
+from board_2048 import DOWN, LEFT, MOVES, RIGHT, SIZE, UP, WIN_EXPONENT
+from game_2048 import Game2048
+
+NO_MOVE = -1    # direction for boards that should stay as they are
+
+_ROW_LEFT = np.array(board_2048.ROW_LEFT, dtype=np.uint16)
+_ROW_RIGHT = np.array(board_2048.ROW_RIGHT, dtype=np.uint16)
+_SCORE_LEFT = np.array(board_2048.SCORE_LEFT, dtype=np.int64)
+_SCORE_RIGHT = np.array(board_2048.SCORE_RIGHT, dtype=np.int64)
+_SCORES = np.stack([_SCORE_LEFT, _SCORE_RIGHT])
+_SCORE_TABLE = np.array([0 if d in (LEFT, UP) else 1 for d in MOVES])   # row of _SCORES per move
+_NIBBLE_SHIFTS = np.array([12, 8, 4, 0], dtype=np.uint16)
+# Every 16-bit row index unpacked into its four exponents
+_ROWS = ((np.arange(1 << 16, dtype=np.uint16)[:, None] >> _NIBBLE_SHIFTS) & 0xF).astype(np.uint8)
+
+
+def _pack_rows(rows):
+    """(..., 4) exponents -> (...) 16-bit row indices."""
+    r = rows.astype(np.uint16)
+    return (r[..., 0] << 12) | (r[..., 1] << 8) | (r[..., 2] << 4) | r[..., 3]
+
+
+def _row_indices(boards, direction):
+    """Packed rows (or columns, for up/down) that a move slides."""
+    return _pack_rows(boards.transpose(0, 2, 1) if direction in (UP, DOWN) else boards)
+
+
+def _tables(direction):
+    if direction in (LEFT, UP):
+        return _ROW_LEFT, _SCORE_LEFT
+    return _ROW_RIGHT, _SCORE_RIGHT
+
+
+def move_boards(boards, direction):
+    """Move every board in a (N, 4, 4) array the same way.
+
+    Returns (new boards, points scored, changed mask), one entry per board.
+    """
+    index = _row_indices(boards, direction)
+    table, scores = _tables(direction)
+    slid = table[index]
+    moved = _ROWS[slid]
+    if direction in (UP, DOWN):
+        moved = np.ascontiguousarray(moved.transpose(0, 2, 1))
+    return moved, scores[index].sum(axis=1), (slid != index).any(axis=1)
+
+
+class BoardBatch:
+    def __init__(self, count=0, boards=None, seed=None):
+        """count new games (two tiles each), or the given (N, 4, 4) exponent array."""
+        self.rng = np.random.default_rng(seed)
+        if boards is None:
+            self.boards = np.zeros((count, SIZE, SIZE), dtype=np.uint8)
+            self.spawn()
+            self.spawn()
+        else:
+            self.boards = np.array(boards, dtype=np.uint8)
+        self.scores = np.zeros(len(self.boards), dtype=np.int64)
+
+    @classmethod
+    def from_games(cls, games, seed=None):
+        """Batch holding copies of some Game2048 boards and scores."""
+        if any(game.size != SIZE for game in games):
+            raise ValueError("BoardBatch holds 4x4 boards only")
+        exponents = [[board_2048.get_tile(game.bits, i) for i in range(board_2048.CELLS)]
+                     for game in games]
+        batch = cls(boards=np.array(exponents, dtype=np.uint8).reshape(-1, SIZE, SIZE),
+                    seed=seed)
+        batch.scores[:] = [game.score for game in games]
+        return batch
+
+    def __len__(self):
+        return len(self.boards)
+
+    def values(self):
+        """Tile values (0, 2, 4, ...) as an (N, 4, 4) int64 array."""
+        return np.where(self.boards > 0, np.left_shift(1, self.boards.astype(np.int64)), 0)
+
+    def empty_counts(self):
+        return (self.boards == 0).sum(axis=(1, 2))
+
+    def max_tiles(self):
+        """Largest tile value on each board."""
+        return np.left_shift(1, self.boards.max(axis=(1, 2)).astype(np.int64))
+
+    def won(self):
+        return self.boards.max(axis=(1, 2)) >= WIN_EXPONENT
+
+    def can_move(self):
+        """(N,) bool: an empty cell or two equal neighbours somewhere."""
+        b = self.boards
+        across = (b[:, :, 1:] == b[:, :, :-1]) & (b[:, :, 1:] > 0)
+        down = (b[:, 1:, :] == b[:, :-1, :]) & (b[:, 1:, :] > 0)
+        return (b == 0).any(axis=(1, 2)) | across.any(axis=(1, 2)) | down.any(axis=(1, 2))
+
+    alive = can_move
+
+    def _candidates(self):
+        """Every direction's rows before and after sliding, packed.
+
+        Returns (source, slid, legal) shaped (4, N, 4), (4, N, 4) and (N, 4).
+        """
+        rows = _pack_rows(self.boards)
+        columns = _pack_rows(self.boards.transpose(0, 2, 1))
+        source = np.stack([columns if direction in (UP, DOWN) else rows for direction in MOVES])
+        slid = np.empty_like(source)
+        for direction in MOVES:
+            slid[direction] = _tables(direction)[0][source[direction]]
+        # Four packed 16-bit rows compare as one 64-bit word.
+        legal = (slid.view(np.uint64) != source.view(np.uint64))[..., 0].T
+        return source, slid, legal
+
+    def legal_moves(self):
+        """(N, 4) bool: which of MOVES would change each board."""
+        return self._candidates()[2]
+
+    def random_moves(self):
+        """A uniformly random legal direction per board (NO_MOVE if stuck)."""
+        return self._pick_random(self.legal_moves())
+
+    def _pick_random(self, legal):
+        pick = np.where(legal, self.rng.random(legal.shape), -1.0).argmax(axis=1)
+        return np.where(legal.any(axis=1), pick, NO_MOVE)
+
+    def step_random(self):
+        """step(random_moves()) without sliding every board twice; returns the moved mask."""
+        source, slid, legal = self._candidates()
+        directions = self._pick_random(legal)
+        moved = np.flatnonzero(directions != NO_MOVE)
+        chosen = directions[moved]
+        boards = _ROWS[slid[chosen, moved]]
+        vertical = (chosen == UP) | (chosen == DOWN)
+        boards[vertical] = boards[vertical].transpose(0, 2, 1)
+        self.boards[moved] = boards
+        scores = _SCORES[_SCORE_TABLE[chosen][:, None], source[chosen, moved]]
+        self.scores[moved] += scores.sum(axis=1)
+        changed = directions != NO_MOVE
+        self.spawn(changed)
+        return changed
+
+    def move(self, directions):
+        """Apply one direction per board ((N,) array or a single int).
+
+        Adds the points to self.scores; returns an (N,) bool mask of the
+        boards that changed.
+        """
+        directions = np.broadcast_to(np.asarray(directions), (len(self),))
+        changed = np.zeros(len(self), dtype=bool)
+        for direction in MOVES:
+            chosen = directions == direction
+            if not chosen.any():
+                continue
+            moved, gained, differs = move_boards(self.boards[chosen], direction)
+            self.boards[chosen] = moved
+            self.scores[chosen] += gained
+            changed[chosen] = differs
+        return changed
+
+    def spawn(self, mask=None):
+        """Add a 2 (90%) or 4 (10%) to a random empty cell of each board in mask."""
+        flat = self.boards.reshape(len(self), -1)
+        empty = flat == 0
+        targets = empty.any(axis=1)
+        if mask is not None:
+            targets &= mask
+        rows = np.flatnonzero(targets)
+        # Pick the r-th empty cell with r uniform below the number of empty cells.
+        seen = empty[rows].cumsum(axis=1, dtype=np.uint8)
+        r = (self.rng.random(len(rows)) * seen[:, -1]).astype(seen.dtype)
+        cells = (seen > r[:, None]).argmax(axis=1)
+        flat[rows, cells] = np.where(self.rng.random(len(rows)) < 0.9, 1, 2)
+
+    def step(self, directions):
+        """Move, then spawn a tile on every board that changed; returns that mask."""
+        changed = self.move(directions)
+        self.spawn(changed)
+        return changed
+
+
+def bench_batch(count, steps, seed):
+    batch = BoardBatch(count, seed=seed)
+    done = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        done += int(batch.step_random().sum())
+    return done / (time.perf_counter() - start)
+
+
+def bench_games(count, steps, seed):
+    """The same random play, one Game2048 at a time."""
+    random.seed(seed)
+    games = []
+    for _ in range(count):
+        game = Game2048()
+        game.add_random_tile()
+        game.add_random_tile()
+        games.append(game)
+    done = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        for game in games:
+            moves = [game.move_left, game.move_right, game.move_up, game.move_down]
+            random.shuffle(moves)
+            for attempt in moves:
+                if attempt():
+                    game.add_random_tile()
+                    done += 1
+                    break
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--boards', type=int, default=10000)
+    parser.add_argument('--steps', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    loop = bench_games(args.boards, args.steps, args.seed)
+    batch = bench_batch(args.boards, args.steps, args.seed)
+    print(f"{args.boards} boards x {args.steps} random moves")
+    print(f"  Game2048 loop  {loop:>12,.0f} board-steps/s")
+    print(f"  BoardBatch     {batch:>12,.0f} board-steps/s  ({batch / loop:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
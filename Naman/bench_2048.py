@@ -0,0 +1,313 @@
+"""
+2048 Benchmark - bitboard engine vs. the original list implementation
+Plays the same random boards through both move engines, checks they
+agree, and prints moves per second for each direction. Then does the
+same for every board size (board_nxn's cached engine for sizes other
+than 4), with the row cache hit rate.
+
+    python3 bench_2048.py --boards 20000
+    python3 bench_2048.py --sizes 3 5 8 --turns 50000
+"""
+
+import argparse
+import random
+import time
+
+import board_2048
+import board_nxn
+from game_2048 import BOARD_SIZE, Game2048
+
+
+class ListGame2048:
+    """The list-of-lists move code Game2048 used before the bitboard,
+    kept verbatim as the baseline (BOARD_SIZE became self.size)."""
+
+    def __init__(self, board):
+        self.board = [row[:] for row in board]
+        self.size = len(board)
+        self.score = 0
+        self.won = False
+
+    def move_left(self):
+        """Move all tiles to the left and merge."""
+        moved = False
+        for i in range(self.size):
+            # Remove zeros
+            row = [cell for cell in self.board[i] if cell != 0]
+            
+            # Merge adjacent identical tiles
+            merged = []
+            j = 0
+            while j < len(row):
+                if j < len(row) - 1 and row[j] == row[j + 1]:
+                    merged.append(row[j] * 2)
+                    self.score += row[j] * 2
+                    if row[j] * 2 == 2048 and not self.won:
+                        self.won = True
+                    j += 2
+                else:
+                    merged.append(row[j])
+                    j += 1
+            
+            # Pad with zeros
+            while len(merged) < self.size:
+                merged.append(0)
+            
+            # Check if moved
+            if self.board[i] != merged:
+                moved = True
+                self.board[i] = merged
+        
+        return moved
+    
+    def move_right(self):
+        """Move all tiles to the right and merge."""
+        moved = False
+        for i in range(self.size):
+            # Remove zeros
+            row = [cell for cell in self.board[i] if cell != 0]
+            
+            # Merge adjacent identical tiles (from right)
+            merged = []
+            j = len(row) - 1
+            while j >= 0:
+                if j > 0 and row[j] == row[j - 1]:
+                    merged.insert(0, row[j] * 2)
+                    self.score += row[j] * 2
+                    if row[j] * 2 == 2048 and not self.won:
+                        self.won = True
+                    j -= 2
+                else:
+                    merged.insert(0, row[j])
+                    j -= 1
+            
+            # Pad with zeros on left
+            while len(merged) < self.size:
+                merged.insert(0, 0)
+            
+            # Check if moved
+            if self.board[i] != merged:
+                moved = True
+                self.board[i] = merged
+        
+        return moved
+    
+    def move_up(self):
+        """Move all tiles up and merge."""
+        moved = False
+        for j in range(self.size):
+            # Get column
+            col = [self.board[i][j] for i in range(self.size)]
+            
+            # Remove zeros
+            col = [cell for cell in col if cell != 0]
+            
+            # Merge adjacent identical tiles
+            merged = []
+            i = 0
+            while i < len(col):
+                if i < len(col) - 1 and col[i] == col[i + 1]:
+                    merged.append(col[i] * 2)
+                    self.score += col[i] * 2
+                    if col[i] * 2 == 2048 and not self.won:
+                        self.won = True
+                    i += 2
+                else:
+                    merged.append(col[i])
+                    i += 1
+            
+            # Pad with zeros
+            while len(merged) < self.size:
+                merged.append(0)
+            
+            # Update column
+            new_col = merged.copy()
+            old_col = [self.board[i][j] for i in range(self.size)]
+            if old_col != new_col:
+                moved = True
+                for i in range(self.size):
+                    self.board[i][j] = new_col[i]
+        
+        return moved
+    
+    def move_down(self):
+        """Move all tiles down and merge."""
+        moved = False
+        for j in range(self.size):
+            # Get column
+            col = [self.board[i][j] for i in range(self.size)]
+            
+            # Remove zeros
+            col = [cell for cell in col if cell != 0]
+            
+            # Merge adjacent identical tiles (from bottom)
+            merged = []
+            i = len(col) - 1
+            while i >= 0:
+                if i > 0 and col[i] == col[i - 1]:
+                    merged.insert(0, col[i] * 2)
+                    self.score += col[i] * 2
+                    if col[i] * 2 == 2048 and not self.won:
+                        self.won = True
+                    i -= 2
+                else:
+                    merged.insert(0, col[i])
+                    i -= 1
+            
+            # Pad with zeros on top
+            while len(merged) < self.size:
+                merged.insert(0, 0)
+            
+            # Update column
+            new_col = merged.copy()
+            old_col = [self.board[i][j] for i in range(self.size)]
+            if old_col != new_col:
+                moved = True
+                for i in range(self.size):
+                    self.board[i][j] = new_col[i]
+        
+        return moved
+
+
+LIST_MOVES = {
+    board_2048.LEFT: ListGame2048.move_left,
+    board_2048.RIGHT: ListGame2048.move_right,
+    board_2048.UP: ListGame2048.move_up,
+    board_2048.DOWN: ListGame2048.move_down,
+}
+
+
+def random_boards(count, seed=0, size=BOARD_SIZE):
+    """Mid-game looking boards: about half the cells filled with small tiles."""
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        boards.append([[rng.choice((0, 0, 2, 2, 4, 8, 16, 32, 64, 128))
+                        for _ in range(size)] for _ in range(size)])
+    return boards
+
+
+def check(boards):
+    """Both engines must produce the same board and score for every move."""
+    engine = board_nxn.engine(len(boards[0]))
+    for grid in boards:
+        packed = engine.encode(grid)
+        for direction, list_move in LIST_MOVES.items():
+            game = ListGame2048(grid)
+            list_move(game)
+            bits, score = engine.move(packed, direction)
+            if engine.decode(bits) != game.board or score != game.score:
+                raise AssertionError(f"engines disagree on {grid} moving "
+                                     f"{board_2048.MOVE_NAMES[direction]}")
+
+
+def bench_list(boards, direction):
+    list_move = LIST_MOVES[direction]
+    games = [ListGame2048(grid) for grid in boards]
+    start = time.perf_counter()
+    for game in games:
+        list_move(game)
+    return len(games) / (time.perf_counter() - start)
+
+
+def bench_bits(boards, direction):
+    packed = [board_2048.encode(grid) for grid in boards]
+    move = board_2048.move
+    start = time.perf_counter()
+    for bits in packed:
+        move(bits, direction)
+    return len(packed) / (time.perf_counter() - start)
+
+
+def bench_game(boards, direction):
+    """Bitboard through the Game2048 API (includes the won/score bookkeeping)."""
+    games = []
+    for grid in boards:
+        game = Game2048(size=len(grid))
+        game.board = grid
+        games.append(game)
+    method = getattr(Game2048, f"move_{board_2048.MOVE_NAMES[direction]}")
+    start = time.perf_counter()
+    for game in games:
+        method(game)
+    return len(games) / (time.perf_counter() - start)
+
+
+def bench_engine(boards, direction):
+    """Packed moves on any board size, through board_nxn.engine()."""
+    engine = board_nxn.engine(len(boards[0]))
+    packed = [engine.encode(grid) for grid in boards]
+    move = engine.move
+    start = time.perf_counter()
+    for bits in packed:
+        move(bits, direction)
+    return len(packed) / (time.perf_counter() - start)
+
+
+def bench_play(size, turns, seed):
+    """Random play (every move tried each turn, new games as needed) on fresh caches.
+
+    Returns (moves/s, row cache hit rate or None for the 4x4 tables).
+    """
+    rng = random.Random(seed)
+    engine = board_2048 if size == BOARD_SIZE else board_nxn.Board(size)
+    bits = 0
+    start = time.perf_counter()
+    for _ in range(turns):
+        options = [after for after in (engine.move(bits, d)[0] for d in board_2048.MOVES)
+                   if after != bits]
+        if options:
+            bits = engine.spawn_tile(rng.choice(options), rng)
+        else:
+            bits = engine.spawn_tile(engine.spawn_tile(0, rng), rng)
+    elapsed = time.perf_counter() - start
+    if engine is board_2048:
+        return 4 * turns / elapsed, None
+    hits = misses = 0
+    for info in engine.cache_info():
+        hits += info.hits
+        misses += info.misses
+    return 4 * turns / elapsed, hits / (hits + misses)
+
+
+def bench_sizes(sizes, count, turns, seed):
+    print(f"\n{count} boards per size, caches warmed by check(); "
+          f"play = {turns} turns of random games on cold caches")
+    print(f"{'size':>4} {'list/s':>12} {'packed/s':>12} {'Game2048/s':>12} {'speedup':>8} "
+          f"{'play/s':>12} {'cache hits':>10}")
+    for size in sizes:
+        boards = random_boards(count, seed, size)
+        check(boards)
+        slow = sum(bench_list(boards, d) for d in board_2048.MOVES) / 4
+        fast = sum(bench_engine(boards, d) for d in board_2048.MOVES) / 4
+        api = sum(bench_game(boards, d) for d in board_2048.MOVES) / 4
+        play, hit_rate = bench_play(size, turns, seed)
+        hits = "tables" if hit_rate is None else f"{100 * hit_rate:.1f}%"
+        print(f"{size:>2}x{size} {slow:>12.0f} {fast:>12.0f} {api:>12.0f} {fast / slow:>7.1f}x "
+              f"{play:>12.0f} {hits:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--boards', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=range(board_nxn.MIN_SIZE, board_nxn.MAX_SIZE + 1))
+    parser.add_argument('--turns', type=int, default=20000, help="random-play turns per size")
+    args = parser.parse_args()
+
+    boards = random_boards(args.boards, args.seed)
+    check(boards[:2000])
+    print(f"{args.boards} boards, engines agree")
+    print(f"{'move':>6} {'list/s':>12} {'bitboard/s':>12} {'Game2048/s':>12} {'speedup':>8}")
+    for direction in board_2048.MOVES:
+        slow = bench_list(boards, direction)
+        fast = bench_bits(boards, direction)
+        api = bench_game(boards, direction)
+        print(f"{board_2048.MOVE_NAMES[direction]:>6} {slow:>12.0f} {fast:>12.0f} "
+              f"{api:>12.0f} {fast / slow:>7.1f}x")
+    bench_sizes(args.sizes, args.boards // 4, args.turns, args.seed)
+
+
+if __name__ == "__main__":
+    main()
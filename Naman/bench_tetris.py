@@ -0,0 +1,222 @@
+"""
+Tetris Benchmark - bitmask boards vs. the original character grids
+Puts random pieces at random spots on random half-filled boards, checks
+both collision tests agree, and prints checks (and rotations) per second.
+Then clears lines from boards that just had a piece locked in, with the
+original list-of-lists code and with the one-pass bitmask version.
+
+    python3 bench_tetris.py --checks 200000
+"""
+
+import argparse
+import random
+import time
+
+from tetris import BOARD_HEIGHT, BOARD_WIDTH, FULL_ROW, ROTATIONS, TETROMINOES, TetrisGame
+
+
+class GridTetrisGame:
+    """The character-grid collision, rotation and line clearing code
+    TetrisGame used before the bitmasks, kept verbatim as the baseline."""
+
+    def __init__(self, board, piece):
+        self.board = board
+        self.current_shape = [list(row) for row in TETROMINOES[piece]]
+        self.current_x = 0
+        self.current_y = 0
+        self.score = 0
+        self.lines_cleared = 0
+        self.level = 1
+        self.fall_speed = 0.5
+
+    def check_collision(self, dx=0, dy=0, shape=None):
+        """Check if current piece collides with board or boundaries."""
+        if shape is None:
+            shape = self.current_shape
+
+        new_x = self.current_x + dx
+        new_y = self.current_y + dy
+
+        for i, row in enumerate(shape):
+            for j, cell in enumerate(row):
+                if cell == '#':
+                    board_y = new_y + i
+                    board_x = new_x + j
+
+                    # Check boundaries
+                    if board_x < 0 or board_x >= BOARD_WIDTH or board_y >= BOARD_HEIGHT:
+                        return True
+
+                    # Check collision with fixed blocks
+                    if board_y >= 0 and self.board[board_y][board_x] == 1:
+                        return True
+
+        return False
+
+    def rotate_piece(self):
+        """Rotate the current piece 90 degrees clockwise."""
+        if not self.current_shape:
+            return
+
+        # Transpose and reverse rows
+        rotated = [list(row) for row in zip(*self.current_shape[::-1])]
+
+        # Check if rotation is valid
+        if not self.check_collision(shape=rotated):
+            self.current_shape = rotated
+
+    def clear_lines(self):
+        """Clear completed lines and shift blocks down."""
+        lines_to_clear = []
+
+        for i in range(BOARD_HEIGHT):
+            if all(cell == 1 for cell in self.board[i]):
+                lines_to_clear.append(i)
+
+        for line in lines_to_clear:
+            del self.board[line]
+            self.board.insert(0, [0 for _ in range(BOARD_WIDTH)])
+
+        if lines_to_clear:
+            self.lines_cleared += len(lines_to_clear)
+            # Score: 100 * lines^2 * level
+            self.score += 100 * (len(lines_to_clear) ** 2) * self.level
+            # Level up every 10 lines
+            self.level = (self.lines_cleared // 10) + 1
+            self.fall_speed = max(0.1, 0.5 - (self.level - 1) * 0.05)
+
+
+def random_positions(count, seed=0):
+    """(grid board, piece, rotation, x, y) tuples; boards are partly full at the bottom."""
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(50):
+        top = rng.randrange(BOARD_HEIGHT // 2, BOARD_HEIGHT)
+        boards.append([[int(y >= top and rng.random() < 0.7) for _ in range(BOARD_WIDTH)]
+                       for y in range(BOARD_HEIGHT)])
+    pieces = list(TETROMINOES)
+    positions = []
+    for _ in range(count):
+        piece = rng.choice(pieces)
+        rotation = rng.randrange(4)
+        shape = ROTATIONS[piece][rotation]
+        # Somewhere the piece's box fits, as in play; the checks then try one step further.
+        positions.append((rng.choice(boards), piece, rotation,
+                          rng.randrange(BOARD_WIDTH - shape.width + 1),
+                          rng.randrange(BOARD_HEIGHT - shape.height + 1)))
+    return positions
+
+
+def grid_game(board, piece, rotation, x, y):
+    game = GridTetrisGame(board, piece)
+    for _ in range(rotation):
+        game.current_shape = [list(row) for row in zip(*game.current_shape[::-1])]
+    game.current_x, game.current_y = x, y
+    return game
+
+
+def bit_game(board, piece, rotation, x, y):
+    game = TetrisGame()
+    game.board = [sum(cell << col for col, cell in enumerate(row)) for row in board]
+    game.current_piece, game.rotation = piece, rotation
+    game.current_x, game.current_y = x, y
+    return game
+
+
+def check(positions):
+    """Both versions must agree on every position and every rotation."""
+    for position in positions:
+        old, new = grid_game(*position), bit_game(*position)
+        for dx, dy in ((0, 0), (-1, 0), (1, 0), (0, 1)):
+            if old.check_collision(dx, dy) != new.check_collision(dx, dy):
+                raise AssertionError(f"collision checks disagree at {position[1:]} + {(dx, dy)}")
+        old.rotate_piece()
+        new.rotate_piece()
+        rows = tuple(sum(1 << j for j, cell in enumerate(row) if cell == '#')
+                     for row in old.current_shape)
+        if rows != ROTATIONS[new.current_piece][new.rotation].rows:
+            raise AssertionError(f"rotations disagree at {position[1:]}")
+
+
+def random_clears(count, seed=0):
+    """(grid board, top row of the last piece) pairs: 0 to 4 full rows among
+    the four rows the piece landed in, partly filled rows elsewhere."""
+    rng = random.Random(seed)
+    clears = []
+    for _ in range(count):
+        stack = rng.randrange(4, BOARD_HEIGHT)
+        top = rng.randrange(BOARD_HEIGHT - stack, BOARD_HEIGHT - 3)
+        board = []
+        for y in range(BOARD_HEIGHT):
+            if y < BOARD_HEIGHT - stack:
+                row = [0] * BOARD_WIDTH
+            elif top <= y < top + 4 and rng.random() < 0.4:
+                row = [1] * BOARD_WIDTH
+            else:
+                row = [1] * BOARD_WIDTH
+                row[rng.randrange(BOARD_WIDTH)] = 0
+            board.append(row)
+        clears.append((board, top))
+    return clears
+
+
+def clear_games(clears):
+    """Matching (grid, bitmask) games for each board, ready to clear lines."""
+    old, new = [], []
+    for board, top in clears:
+        grid = GridTetrisGame([row[:] for row in board], 'I')
+        bits = TetrisGame()
+        bits.board = [sum(cell << col for col, cell in enumerate(row)) for row in board]
+        bits.clear_top = top
+        old.append(grid)
+        new.append(bits)
+    return old, new
+
+
+def check_clears(clears):
+    for grid, bits in zip(*clear_games(clears)):
+        grid.clear_lines()
+        bits.clear_lines(bits.clear_top, bits.clear_top + 4)
+        packed = [sum(cell << col for col, cell in enumerate(row)) for row in grid.board]
+        if packed != bits.board or grid.score != bits.score:
+            raise AssertionError("line clears disagree")
+        if FULL_ROW in bits.board:
+            raise AssertionError("a full row was left behind")
+
+
+def bench(games, operation):
+    start = time.perf_counter()
+    for game in games:
+        operation(game)
+    return len(games) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--checks', type=int, default=200000)
+    parser.add_argument('--clears', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    positions = random_positions(args.checks, args.seed)
+    check(positions[:20000])
+    print(f"{args.checks} positions, both versions agree")
+    old = [grid_game(*position) for position in positions]
+    new = [bit_game(*position) for position in positions]
+    print(f"{'operation':>10} {'grid/s':>12} {'bitmask/s':>12} {'speedup':>8}")
+    for name, operation in (('collision', lambda game: game.check_collision(0, 1)),
+                            ('rotate', lambda game: game.rotate_piece())):
+        slow = bench(old, operation)
+        fast = bench(new, operation)
+        print(f"{name:>10} {slow:>12.0f} {fast:>12.0f} {fast / slow:>7.1f}x")
+
+    clears = random_clears(args.clears, args.seed)
+    check_clears(clears[:20000])
+    old, new = clear_games(clears)
+    slow = bench(old, lambda game: game.clear_lines())
+    fast = bench(new, lambda game: game.clear_lines(game.clear_top, game.clear_top + 4))
+    print(f"{'clear':>10} {slow:>12.0f} {fast:>12.0f} {fast / slow:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
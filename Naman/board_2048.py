@@ -0,0 +1,176 @@
+"""
+2048 Bitboard - packed move engine used by game_2048.py
+The whole 4x4 board is one 64-bit integer with 4 bits per cell holding
+the tile's exponent (0 = empty, 1 = 2, 2 = 4, ... 11 = 2048). Row 0 is
+the top 16 bits and column 0 the top nibble of each row, so
+hex(board) reads like the grid.
+
+Every possible 16-bit row is slid once at import time into 65,536-entry
+tables, so moving left or right is four table lookups; up and down
+transpose the board, use the same tables, and transpose back.
+
+Exponents stop at 15 (32768): two 32768 tiles don't merge.
+"""
+
+SIZE = 4
+CELLS = SIZE * SIZE
+ROW_MASK = 0xFFFF
+MAX_EXPONENT = 15
+WIN_EXPONENT = 11           # 2048
+
+LEFT, RIGHT, UP, DOWN = range(4)
+MOVES = (LEFT, RIGHT, UP, DOWN)
+MOVE_NAMES = ('left', 'right', 'up', 'down')
+
+
+def _slide(tiles):
+    """Slide and merge one row of exponents to the left; returns (row, score)."""
+    packed = [t for t in tiles if t]
+    merged = []
+    score = 0
+    i = 0
+    while i < len(packed):
+        tile = packed[i]
+        if i + 1 < len(packed) and packed[i + 1] == tile and tile < MAX_EXPONENT:
+            merged.append(tile + 1)
+            score += 1 << (tile + 1)
+            i += 2
+        else:
+            merged.append(tile)
+            i += 1
+    return merged + [0] * (SIZE - len(merged)), score
+
+
+def _unpack_row(row):
+    return [(row >> 12) & 0xF, (row >> 8) & 0xF, (row >> 4) & 0xF, row & 0xF]
+
+
+def _pack_row(tiles):
+    return (tiles[0] << 12) | (tiles[1] << 8) | (tiles[2] << 4) | tiles[3]
+
+
+def reverse_row(row):
+    """Row with its four nibbles in the opposite order."""
+    return ((row & 0xF) << 12) | ((row & 0xF0) << 4) | ((row >> 4) & 0xF0) | (row >> 12)
+
+
+def _build_tables():
+    left = [0] * (ROW_MASK + 1)
+    left_score = [0] * (ROW_MASK + 1)
+    for row in range(ROW_MASK + 1):
+        tiles, score = _slide(_unpack_row(row))
+        left[row] = _pack_row(tiles)
+        left_score[row] = score
+    right = [reverse_row(left[reverse_row(row)]) for row in range(ROW_MASK + 1)]
+    right_score = [left_score[reverse_row(row)] for row in range(ROW_MASK + 1)]
+    return left, right, left_score, right_score
+
+
+# Result of moving each possible row, and the points scored doing it
+ROW_LEFT, ROW_RIGHT, SCORE_LEFT, SCORE_RIGHT = _build_tables()
+
+
+def transpose(board):
+    """Swap rows and columns (three masked shifts per step, no loops)."""
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _move_rows(board, table, scores):
+    r0 = board >> 48
+    r1 = (board >> 32) & ROW_MASK
+    r2 = (board >> 16) & ROW_MASK
+    r3 = board & ROW_MASK
+    return ((table[r0] << 48) | (table[r1] << 32) | (table[r2] << 16) | table[r3],
+            scores[r0] + scores[r1] + scores[r2] + scores[r3])
+
+
+def move(board, direction):
+    """Apply a move; returns (new board, points scored). Unchanged board = illegal move."""
+    if direction == LEFT:
+        return _move_rows(board, ROW_LEFT, SCORE_LEFT)
+    if direction == RIGHT:
+        return _move_rows(board, ROW_RIGHT, SCORE_RIGHT)
+    table, scores = (ROW_LEFT, SCORE_LEFT) if direction == UP else (ROW_RIGHT, SCORE_RIGHT)
+    moved, score = _move_rows(transpose(board), table, scores)
+    return transpose(moved), score
+
+
+def can_move(board):
+    """True if any move changes the board."""
+    if count_empty(board):
+        return True
+    return any(move(board, direction)[0] != board for direction in MOVES)
+
+
+def count_empty(board):
+    """Number of empty cells."""
+    # Fold each nibble into its low bit, set when the nibble is non-zero.
+    x = board | (board >> 1)
+    x |= x >> 2
+    x &= 0x1111111111111111
+    return CELLS - bin(x).count('1')
+
+
+def empty_cells(board):
+    """Indices (row * 4 + col) of empty cells, in reading order."""
+    return [i for i in range(CELLS) if not (board >> ((CELLS - 1 - i) << 2)) & 0xF]
+
+
+def get_tile(board, index):
+    """Exponent at cell index (row * 4 + col)."""
+    return (board >> ((CELLS - 1 - index) << 2)) & 0xF
+
+
+def place(board, index, exponent):
+    """Board with the cell at index set to exponent."""
+    shift = (CELLS - 1 - index) << 2
+    return (board & ~(0xF << shift)) | (exponent << shift)
+
+
+def spawn_tile(board, rng):
+    """Board with a 2 (90%) or 4 (10%) added to a random empty cell.
+
+    rng is the random module or a random.Random; a full board comes back
+    unchanged.
+    """
+    empty = empty_cells(board)
+    if not empty:
+        return board
+    cell = rng.choice(empty)
+    return place(board, cell, 1 if rng.random() < 0.9 else 2)
+
+
+def max_exponent(board):
+    """Largest exponent on the board."""
+    best = 0
+    while board:
+        best = max(best, board & 0xF)
+        board >>= 4
+    return best
+
+
+def encode(grid):
+    """Pack a list-of-lists board of tile values (0, 2, 4, ...) into an int."""
+    board = 0
+    for row in grid:
+        for value in row:
+            board = (board << 4) | (value.bit_length() - 1 if value else 0)
+    return board
+
+
+def decode(board):
+    """Unpack an int into a list-of-lists board of tile values."""
+    grid = []
+    for r in range(SIZE):
+        row = []
+        for exponent in _unpack_row((board >> ((SIZE - 1 - r) * 16)) & ROW_MASK):
+            row.append(1 << exponent if exponent else 0)
+        grid.append(row)
+    return grid
@@ -0,0 +1,196 @@
+"""
+2048 Board NxN - packed move engine for boards other than 4x4
+Same layout as board_2048: the board is one integer of tile exponents,
+row 0 in the top bits and column 0 at the top of each row. Cells are 4
+bits wide up to 4x4 and 5 bits wide beyond (exponents up to 31), so an
+8x8 board is a 320-bit int.
+
+Rows of more than 16 bits have too many values to tabulate up front, so
+sliding a row and spreading it into a column (for the transpose) are
+computed on first use and kept in LRU caches keyed on the packed row.
+Real games revisit a small set of rows, so almost every move is N cache
+hits; up and down moves transpose with N more.
+
+    engine = Board(5)
+    board = engine.spawn_tile(engine.spawn_tile(0, rng), rng)
+    board, points = engine.move(board, board_2048.LEFT)
+
+A Board has the same functions as the board_2048 module, which stays the
+(faster, fully tabulated) engine for 4x4.
+"""
+
+from functools import lru_cache
+
+import board_2048
+from board_2048 import LEFT, MOVES, RIGHT, UP
+
+MIN_SIZE = 3
+MAX_SIZE = 8
+ROW_CACHE_SIZE = 1 << 16    # rows kept per cache (two slide caches and a spread cache)
+
+
+class Board:
+    def __init__(self, size, cache_size=ROW_CACHE_SIZE):
+        """Move engine for size x size boards."""
+        if not MIN_SIZE <= size <= MAX_SIZE:
+            raise ValueError(f"board size must be {MIN_SIZE}..{MAX_SIZE}, not {size}")
+        self.size = size
+        self.cells = size * size
+        self.cell_bits = 4 if size <= 4 else 5
+        self.cell_mask = (1 << self.cell_bits) - 1
+        self.MAX_EXPONENT = self.cell_mask     # two tiles this big don't merge, as in board_2048
+        self.row_bits = size * self.cell_bits
+        self.row_mask = (1 << self.row_bits) - 1
+        self._row_shifts = [(size - 1 - r) * self.row_bits for r in range(size)]
+        self._cell_shifts = [(size - 1 - c) * self.cell_bits for c in range(size)]
+        # Row r of a board lands in column r of its transpose
+        self._transpose_shifts = list(zip(self._row_shifts, self._cell_shifts))
+        self.slide_left = lru_cache(cache_size)(self._slide_left)
+        self.slide_right = lru_cache(cache_size)(self._slide_right)
+        self.spread = lru_cache(cache_size)(self._spread)
+
+    def __repr__(self):
+        return f"Board({self.size})"
+
+    def cache_info(self):
+        """lru_cache statistics for the left, right and spread caches."""
+        return self.slide_left.cache_info(), self.slide_right.cache_info(), self.spread.cache_info()
+
+    # Row tables, filled lazily
+
+    def unpack_row(self, row):
+        return [(row >> shift) & self.cell_mask for shift in self._cell_shifts]
+
+    def pack_row(self, tiles):
+        row = 0
+        for tile in tiles:
+            row = (row << self.cell_bits) | tile
+        return row
+
+    def _merge(self, tiles):
+        """Slide and merge exponents towards index 0; returns (tiles, score)."""
+        packed = [t for t in tiles if t]
+        merged = []
+        score = 0
+        i = 0
+        while i < len(packed):
+            tile = packed[i]
+            if i + 1 < len(packed) and packed[i + 1] == tile and tile < self.MAX_EXPONENT:
+                merged.append(tile + 1)
+                score += 1 << (tile + 1)
+                i += 2
+            else:
+                merged.append(tile)
+                i += 1
+        return merged + [0] * (self.size - len(merged)), score
+
+    def _slide_left(self, row):
+        tiles, score = self._merge(self.unpack_row(row))
+        return self.pack_row(tiles), score
+
+    def _slide_right(self, row):
+        tiles, score = self._merge(self.unpack_row(row)[::-1])
+        return self.pack_row(tiles[::-1]), score
+
+    def _spread(self, row):
+        """The row's cells moved to where a transpose puts column 0."""
+        spread = 0
+        for c, shift in enumerate(self._cell_shifts):
+            spread |= ((row >> shift) & self.cell_mask) << self._row_shifts[c]
+        return spread
+
+    # Board operations (same names and meaning as in board_2048)
+
+    def rows(self, board):
+        mask = self.row_mask
+        return [(board >> shift) & mask for shift in self._row_shifts]
+
+    def transpose(self, board):
+        """Swap rows and columns: row r spreads into column r."""
+        spread = self.spread
+        mask = self.row_mask
+        result = 0
+        for row_shift, column_shift in self._transpose_shifts:
+            result |= spread((board >> row_shift) & mask) << column_shift
+        return result
+
+    def _move_rows(self, board, slide):
+        mask = self.row_mask
+        bits = self.row_bits
+        result = 0
+        score = 0
+        for shift in self._row_shifts:
+            moved, points = slide((board >> shift) & mask)
+            result = (result << bits) | moved
+            score += points
+        return result, score
+
+    def move(self, board, direction):
+        """Apply a move; returns (new board, points scored). Unchanged board = illegal move."""
+        if direction == LEFT:
+            return self._move_rows(board, self.slide_left)
+        if direction == RIGHT:
+            return self._move_rows(board, self.slide_right)
+        slide = self.slide_left if direction == UP else self.slide_right
+        moved, score = self._move_rows(self.transpose(board), slide)
+        return self.transpose(moved), score
+
+    def can_move(self, board):
+        """True if any move changes the board."""
+        if self.count_empty(board):
+            return True
+        return any(self.move(board, direction)[0] != board for direction in MOVES)
+
+    def count_empty(self, board):
+        return len(self.empty_cells(board))
+
+    def empty_cells(self, board):
+        """Indices (row * size + col) of empty cells, in reading order."""
+        return [i for i in range(self.cells) if not self.get_tile(board, i)]
+
+    def get_tile(self, board, index):
+        return (board >> ((self.cells - 1 - index) * self.cell_bits)) & self.cell_mask
+
+    def place(self, board, index, exponent):
+        shift = (self.cells - 1 - index) * self.cell_bits
+        return (board & ~(self.cell_mask << shift)) | (exponent << shift)
+
+    def spawn_tile(self, board, rng):
+        """Board with a 2 (90%) or 4 (10%) added to a random empty cell."""
+        empty = self.empty_cells(board)
+        if not empty:
+            return board
+        cell = rng.choice(empty)
+        return self.place(board, cell, 1 if rng.random() < 0.9 else 2)
+
+    def max_exponent(self, board):
+        """Largest exponent on the board."""
+        best = 0
+        while board:
+            best = max(best, board & self.cell_mask)
+            board >>= self.cell_bits
+        return best
+
+    def encode(self, grid):
+        """Pack a list-of-lists board of tile values (0, 2, 4, ...) into an int."""
+        board = 0
+        for row in grid:
+            for value in row:
+                board = (board << self.cell_bits) | (value.bit_length() - 1 if value else 0)
+        return board
+
+    def decode(self, board):
+        """Unpack an int into a list-of-lists board of tile values."""
+        return [[1 << e if e else 0 for e in self.unpack_row(row)] for row in self.rows(board)]
+
+
+_engines = {}
+
+
+def engine(size):
+    """The move engine for a board size: board_2048 itself for 4x4, else a shared Board."""
+    if size == board_2048.SIZE:
+        return board_2048
+    if size not in _engines:
+        _engines[size] = Board(size)
+    return _engines[size]
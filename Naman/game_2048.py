@@ -1,311 +1,263 @@
 """
 2048 Game (CLI) - Python Implementation
 A sliding tile puzzle game where you combine tiles to reach 2048.
+The board is kept packed in one integer (see board_2048.py, or
+board_nxn.py for sizes other than 4x4); self.board gives a read-only
+rows-of-tiles view (assign a whole board to change it).
+
+Every move played with step() is kept as a snapshot of three ints
+(board, score, RNG state), so undo and redo just swap snapshots, and
+the game's action log plus its seed is enough to replay it exactly
+(see replay_2048.py).
 """
 
+import argparse
 import random
-import os
-import sys
+
+import board_2048
+import board_nxn
+import terminal
 
 BOARD_SIZE = 4
+WIN_TILE = 2048
+MASK64 = (1 << 64) - 1
+
+# One character per action in Game2048.actions
+MOVE_CODES = 'lrud'     # indexed by board_2048.LEFT, RIGHT, UP, DOWN
+UNDO, REDO = '-', '+'
+
+
+class GameRandom(random.Random):
+    """random.Random driven by SplitMix64, so its whole state is one 64-bit int."""
+    
+    def seed(self, a=None):
+        self.state = (random.getrandbits(64) if a is None else int(a)) & MASK64
+    
+    def getstate(self):
+        return self.state
+    
+    def setstate(self, state):
+        self.state = state
+    
+    def _next(self):
+        self.state = z = (self.state + 0x9E3779B97F4A7C15) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return z ^ (z >> 31)
+    
+    def random(self):
+        return (self._next() >> 11) * (1.0 / (1 << 53))
+    
+    def getrandbits(self, k):
+        bits = 0
+        for _ in range(0, k, 64):
+            bits = (bits << 64) | self._next()
+        return bits >> (-k % 64)
+
 
 class Game2048:
-    def __init__(self):
-        """Initialize the game with an empty board."""
-        self.board = [[0 for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+    def __init__(self, seed=None, size=BOARD_SIZE, win_tile=WIN_TILE):
+        """Initialize the game with an empty size x size board (3 to 8).
+        
+        Tiles come from the game's own generator; without a seed one is
+        drawn from the random module, so random.seed() still fixes a game.
+        """
+        if win_tile < 4 or win_tile & (win_tile - 1):
+            raise ValueError(f"win tile must be a power of two of at least 4, not {win_tile}")
+        self.size = size
+        self.engine = board_nxn.engine(size)
+        if win_tile > 1 << self.engine.MAX_EXPONENT:
+            raise ValueError(f"tiles on a {size}x{size} board stop at "
+                             f"{1 << self.engine.MAX_EXPONENT}; can't win at {win_tile}")
+        self.win_tile = win_tile
+        self.win_exponent = win_tile.bit_length() - 1
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.rng = GameRandom(self.seed)
+        self.bits = 0       # packed board, one tile exponent per cell
         self.score = 0
         self.game_over = False
         self.won = False
+        self.history = []   # snapshots before each step(), for undo
+        self.future = []    # snapshots undone, for redo
+        self.actions = []   # MOVE_CODES / UNDO / REDO, for replays
+    
+    @property
+    def board(self):
+        """The board as a tuple of row tuples of tile values.
+        
+        It's a read-only snapshot, so game.board[r][c] = v raises instead of
+        being silently lost; only assigning a whole board (game.board = grid,
+        any rows of tile values) changes the game.
+        """
+        return tuple(map(tuple, self.engine.decode(self.bits)))
+    
+    @board.setter
+    def board(self, grid):
+        self.bits = self.engine.encode(grid)
         
     def print_board(self):
         """Print the current state of the board."""
-        os.system('clear' if os.name == 'posix' else 'cls')
-        print("=" * 50)
-        print("2048 GAME")
-        print("=" * 50)
-        print(f"Score: {self.score}\n")
+        lines = [
+            "=" * 50,
+            "2048 GAME",
+            "=" * 50,
+            f"Score: {self.score}",
+            "",
+        ]
         
         for row in self.board:
-            print("|", end="")
-            for cell in row:
-                if cell == 0:
-                    print(f"{' ' * 4:^6}|", end="")
-                else:
-                    print(f"{cell:^6}|", end="")
-            print()
-            print("-" * 31)
+            cells = "".join(f"{' ' * 4:^6}|" if cell == 0 else f"{cell:^6}|" for cell in row)
+            lines.append("|" + cells)
+            lines.append("-" * (7 * self.size + 3))
         
-        print("\nUse arrow keys or WASD to move")
-        print("Press 'q' to quit")
+        lines += ["", "Use arrow keys or WASD to move, 'u' to undo, 'r' to redo",
+                  "Press 'q' to quit"]
         
         if self.won:
-            print("\n🎉 CONGRATULATIONS! You reached 2048!")
+            lines += ["", f"🎉 CONGRATULATIONS! You reached {self.win_tile}!"]
         if self.game_over:
-            print("\n💀 GAME OVER! No more moves available.")
+            lines += ["", "💀 GAME OVER! No more moves available."]
+        
+        # Only the cells that changed since the last frame are redrawn
+        terminal.screen().draw(lines)
     
     def add_random_tile(self):
         """Add a random tile (2 or 4) to an empty cell."""
-        empty_cells = []
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE):
-                if self.board[i][j] == 0:
-                    empty_cells.append((i, j))
+        self.bits = self.engine.spawn_tile(self.bits, self.rng)
+    
+    def start(self):
+        """Put the two opening tiles on the board."""
+        self.add_random_tile()
+        self.add_random_tile()
+        return self
+    
+    def snapshot(self):
+        """(board, score, RNG state): everything needed to come back to this point."""
+        return self.bits, self.score, self.rng.state
+    
+    def restore(self, snapshot):
+        self.bits, self.score, self.rng.state = snapshot
+        self.won = self.engine.max_exponent(self.bits) >= self.win_exponent
+        self.game_over = False
+    
+    def step(self, direction):
+        """Play a move as a player does: slide, add a tile, check for game over.
         
-        if empty_cells:
-            row, col = random.choice(empty_cells)
-            self.board[row][col] = 2 if random.random() < 0.9 else 4
+        Returns True if the board moved; that move can then be undone.
+        """
+        before = self.snapshot()
+        if not self._move(direction):
+            return False
+        self.add_random_tile()
+        self.history.append(before)
+        self.future.clear()
+        self.actions.append(MOVE_CODES[direction])
+        if not self.can_move():
+            self.game_over = True
+        return True
+    
+    def undo(self):
+        """Go back one step(); returns False if there is nothing to undo."""
+        if not self.history:
+            return False
+        self.future.append(self.snapshot())
+        self.restore(self.history.pop())
+        self.actions.append(UNDO)
+        return True
+    
+    def redo(self):
+        """Replay the last undone step(); returns False if there is none."""
+        if not self.future:
+            return False
+        self.history.append(self.snapshot())
+        self.restore(self.future.pop())
+        self.actions.append(REDO)
+        return True
+    
+    def _move(self, direction):
+        """Apply one move to the packed board; returns True if anything moved."""
+        bits, gained = self.engine.move(self.bits, direction)
+        if bits == self.bits:
+            return False
+        self.bits = bits
+        self.score += gained
+        # Making the winning tile scores at least its value, so skip the scan otherwise
+        if (not self.won and gained >= self.win_tile
+                and self.engine.max_exponent(bits) >= self.win_exponent):
+            self.won = True
+        return True
     
     def move_left(self):
         """Move all tiles to the left and merge."""
-        moved = False
-        for i in range(BOARD_SIZE):
-            # Remove zeros
-            row = [cell for cell in self.board[i] if cell != 0]
-            
-            # Merge adjacent identical tiles
-            merged = []
-            j = 0
-            while j < len(row):
-                if j < len(row) - 1 and row[j] == row[j + 1]:
-                    merged.append(row[j] * 2)
-                    self.score += row[j] * 2
-                    if row[j] * 2 == 2048 and not self.won:
-                        self.won = True
-                    j += 2
-                else:
-                    merged.append(row[j])
-                    j += 1
-            
-            # Pad with zeros
-            while len(merged) < BOARD_SIZE:
-                merged.append(0)
-            
-            # Check if moved
-            if self.board[i] != merged:
-                moved = True
-                self.board[i] = merged
-        
-        return moved
+        return self._move(board_2048.LEFT)
     
     def move_right(self):
         """Move all tiles to the right and merge."""
-        moved = False
-        for i in range(BOARD_SIZE):
-            # Remove zeros
-            row = [cell for cell in self.board[i] if cell != 0]
-            
-            # Merge adjacent identical tiles (from right)
-            merged = []
-            j = len(row) - 1
-            while j >= 0:
-                if j > 0 and row[j] == row[j - 1]:
-                    merged.insert(0, row[j] * 2)
-                    self.score += row[j] * 2
-                    if row[j] * 2 == 2048 and not self.won:
-                        self.won = True
-                    j -= 2
-                else:
-                    merged.insert(0, row[j])
-                    j -= 1
-            
-            # Pad with zeros on left
-            while len(merged) < BOARD_SIZE:
-                merged.insert(0, 0)
-            
-            # Check if moved
-            if self.board[i] != merged:
-                moved = True
-                self.board[i] = merged
-        
-        return moved
+        return self._move(board_2048.RIGHT)
     
     def move_up(self):
         """Move all tiles up and merge."""
-        moved = False
-        for j in range(BOARD_SIZE):
-            # Get column
-            col = [self.board[i][j] for i in range(BOARD_SIZE)]
-            
-            # Remove zeros
-            col = [cell for cell in col if cell != 0]
-            
-            # Merge adjacent identical tiles
-            merged = []
-            i = 0
-            while i < len(col):
-                if i < len(col) - 1 and col[i] == col[i + 1]:
-                    merged.append(col[i] * 2)
-                    self.score += col[i] * 2
-                    if col[i] * 2 == 2048 and not self.won:
-                        self.won = True
-                    i += 2
-                else:
-                    merged.append(col[i])
-                    i += 1
-            
-            # Pad with zeros
-            while len(merged) < BOARD_SIZE:
-                merged.append(0)
-            
-            # Update column
-            new_col = merged.copy()
-            old_col = [self.board[i][j] for i in range(BOARD_SIZE)]
-            if old_col != new_col:
-                moved = True
-                for i in range(BOARD_SIZE):
-                    self.board[i][j] = new_col[i]
-        
-        return moved
+        return self._move(board_2048.UP)
     
     def move_down(self):
         """Move all tiles down and merge."""
-        moved = False
-        for j in range(BOARD_SIZE):
-            # Get column
-            col = [self.board[i][j] for i in range(BOARD_SIZE)]
-            
-            # Remove zeros
-            col = [cell for cell in col if cell != 0]
-            
-            # Merge adjacent identical tiles (from bottom)
-            merged = []
-            i = len(col) - 1
-            while i >= 0:
-                if i > 0 and col[i] == col[i - 1]:
-                    merged.insert(0, col[i] * 2)
-                    self.score += col[i] * 2
-                    if col[i] * 2 == 2048 and not self.won:
-                        self.won = True
-                    i -= 2
-                else:
-                    merged.insert(0, col[i])
-                    i -= 1
-            
-            # Pad with zeros on top
-            while len(merged) < BOARD_SIZE:
-                merged.insert(0, 0)
-            
-            # Update column
-            new_col = merged.copy()
-            old_col = [self.board[i][j] for i in range(BOARD_SIZE)]
-            if old_col != new_col:
-                moved = True
-                for i in range(BOARD_SIZE):
-                    self.board[i][j] = new_col[i]
-        
-        return moved
+        return self._move(board_2048.DOWN)
     
     def can_move(self):
         """Check if any moves are possible."""
-        # Check for empty cells
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE):
-                if self.board[i][j] == 0:
-                    return True
-        
-        # Check for possible merges
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE):
-                current = self.board[i][j]
-                # Check right
-                if j < BOARD_SIZE - 1 and self.board[i][j + 1] == current:
-                    return True
-                # Check down
-                if i < BOARD_SIZE - 1 and self.board[i + 1][j] == current:
-                    return True
-        
-        return False
+        return self.engine.can_move(self.bits)
     
     def play(self):
         """Main game loop."""
         # Add two initial tiles
-        self.add_random_tile()
-        self.add_random_tile()
+        self.start()
+        
+        moves = {
+            'w': board_2048.UP, 's': board_2048.DOWN, 'a': board_2048.LEFT, 'd': board_2048.RIGHT,
+            terminal.UP: board_2048.UP, terminal.DOWN: board_2048.DOWN,
+            terminal.LEFT: board_2048.LEFT, terminal.RIGHT: board_2048.RIGHT,
+        }
         
-        try:
-            import tty
-            import termios
-            
-            def get_key():
-                """Get a single keypress."""
-                fd = sys.stdin.fileno()
-                old_settings = termios.tcgetattr(fd)
-                try:
-                    tty.setraw(sys.stdin.fileno())
-                    ch = sys.stdin.read(1)
-                finally:
-                    termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-                return ch
-            
+        with terminal.KeyReader() as keys:
             while not self.game_over:
                 self.print_board()
                 
-                key = get_key()
-                
-                if key == 'q':
+                key = keys.get().key
+                if len(key) == 1:
+                    key = key.lower()
+                if key == 'q' or key == terminal.EOF:
                     print("\nThanks for playing!")
                     break
                 
-                moved = False
-                if key == '\x1b':  # Escape sequence
-                    key2 = get_key()
-                    if key2 == '[':
-                        key3 = get_key()
-                        if key3 == 'A':  # Up arrow
-                            moved = self.move_up()
-                        elif key3 == 'B':  # Down arrow
-                            moved = self.move_down()
-                        elif key3 == 'C':  # Right arrow
-                            moved = self.move_right()
-                        elif key3 == 'D':  # Left arrow
-                            moved = self.move_left()
-                elif key.lower() == 'w':
-                    moved = self.move_up()
-                elif key.lower() == 's':
-                    moved = self.move_down()
-                elif key.lower() == 'a':
-                    moved = self.move_left()
-                elif key.lower() == 'd':
-                    moved = self.move_right()
-                
-                if moved:
-                    self.add_random_tile()
-                    if not self.can_move():
-                        self.game_over = True
-                        self.print_board()
-                        break
-        except ImportError:
-            # Fallback for Windows
-            print("\nNote: Arrow keys may not work on Windows. Use WASD instead.")
-            while not self.game_over:
-                self.print_board()
-                move = input("\nEnter move (w/a/s/d or q to quit): ").strip().lower()
-                
-                if move == 'q':
-                    print("\nThanks for playing!")
+                if key == 'u':
+                    self.undo()
+                elif key == 'r':
+                    self.redo()
+                elif key in moves and self.step(moves[key]) and self.game_over:
+                    self.print_board()
                     break
-                
-                moved = False
-                if move == 'w':
-                    moved = self.move_up()
-                elif move == 's':
-                    moved = self.move_down()
-                elif move == 'a':
-                    moved = self.move_left()
-                elif move == 'd':
-                    moved = self.move_right()
-                
-                if moved:
-                    self.add_random_tile()
-                    if not self.can_move():
-                        self.game_over = True
-                        self.print_board()
-                        break
 
 def main():
     """Main function to start the game."""
-    game = Game2048()
+    parser = argparse.ArgumentParser(description="2048 in the terminal")
+    parser.add_argument('--size', type=int, default=BOARD_SIZE,
+                        help=f"board size, {board_nxn.MIN_SIZE} to {board_nxn.MAX_SIZE}")
+    parser.add_argument('--win', type=int, default=WIN_TILE, help="tile that wins the game")
+    parser.add_argument('--seed', type=int, help="play a reproducible game")
+    parser.add_argument('--record', metavar='FILE', help="save a replay of the game here")
+    args = parser.parse_args()
+    
+    if not board_nxn.MIN_SIZE <= args.size <= board_nxn.MAX_SIZE:
+        parser.error(f"--size must be {board_nxn.MIN_SIZE} to {board_nxn.MAX_SIZE}")
+    try:
+        game = Game2048(args.seed, args.size, args.win)
+    except ValueError as e:
+        parser.error(str(e))
     game.play()
+    if args.record:
+        import replay_2048
+        replay_2048.save(game, args.record)
+        print(f"Replay saved to {args.record}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,102 @@
+"""
+2048 Replay - save and re-run recorded games of game_2048
+A replay is a small JSON file: the game's seed, its action log (one
+character per move, undo or redo; see game_2048.MOVE_CODES), the board
+size and win tile, and the final board and score. Replaying starts a
+Game2048 from the same seed and repeats every action, so the same tiles
+appear in the same places; the result is checked against the recorded
+one.
+
+    python3 game_2048.py --seed 7 --record game.json
+    python3 replay_2048.py game.json            # verify as fast as possible
+    python3 replay_2048.py game.json --show     # watch it
+"""
+
+import argparse
+import json
+import time
+
+from game_2048 import BOARD_SIZE, MOVE_CODES, REDO, UNDO, WIN_TILE, Game2048
+
+VERSION = 1
+
+
+def record(game):
+    """A finished (or interrupted) game as a JSON-ready dict."""
+    return {
+        'version': VERSION,
+        'seed': game.seed,
+        'size': game.size,
+        'win_tile': game.win_tile,
+        'actions': ''.join(game.actions),
+        'score': game.score,
+        'board': hex(game.bits),
+    }
+
+
+def save(game, path):
+    with open(path, 'w') as f:
+        json.dump(record(game), f)
+        f.write('\n')
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    if data.get('version') != VERSION:
+        raise ValueError(f"{path}: unsupported replay version {data.get('version')!r}")
+    return data
+
+
+def replay(data, verify=True, on_action=None):
+    """Re-run a recorded game; returns the resulting Game2048.
+
+    on_action(game) is called after every action. With verify, raises
+    ValueError if an action doesn't apply or the game ends differently.
+    """
+    game = Game2048(data['seed'], data.get('size', BOARD_SIZE),
+                    data.get('win_tile', WIN_TILE)).start()
+    for number, code in enumerate(data['actions'], 1):
+        if code == UNDO:
+            done = game.undo()
+        elif code == REDO:
+            done = game.redo()
+        elif code in MOVE_CODES:
+            done = game.step(MOVE_CODES.index(code))
+        else:
+            raise ValueError(f"action {number}: unknown code {code!r}")
+        if verify and not done:
+            raise ValueError(f"action {number} ({code!r}) changed nothing; "
+                             f"the replay doesn't match this version of the game")
+        if on_action:
+            on_action(game)
+    if verify and (game.score, game.bits) != (data['score'], int(data['board'], 16)):
+        raise ValueError(f"replay ended with score {game.score}, board {game.bits:#x}; "
+                         f"recorded score {data['score']}, board {data['board']}")
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('replay', help="file written by game_2048.py --record")
+    parser.add_argument('--show', action='store_true', help="draw the board after each action")
+    parser.add_argument('--delay', type=float, default=0.1, help="seconds per action with --show")
+    args = parser.parse_args()
+
+    data = load(args.replay)
+
+    def show(game):
+        game.print_board()
+        time.sleep(args.delay)
+
+    start = time.perf_counter()
+    game = replay(data, on_action=show if args.show else None)
+    elapsed = time.perf_counter() - start
+    actions = len(data['actions'])
+    print(f"replay OK: {actions} actions, score {game.score}, "
+          f"max tile {1 << game.engine.max_exponent(game.bits)}, "
+          f"{actions / elapsed:,.0f} actions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Tetris Replay - save and re-run recorded games of tetris.py
+A replay is a small JSON file: the seed and randomizer that dealt the
+pieces, the game's action log (see the action tokens in tetris.py), and
+the final board, lines and score. Runs of the same token are stored as
+count + token ("17." is seventeen gravity ticks), which keeps an hour of
+play to a few KB.
+
+Replaying deals the same pieces and repeats every action headlessly, as
+fast as it can, then checks the result against the recorded one. Games
+played by tetris_ai (PLACE tokens) replay the same way.
+
+    python3 tetris.py --seed 7 --record game.json
+    python3 replay_tetris.py game.json            # verify
+    python3 replay_tetris.py game.json --show     # watch it
+"""
+
+import argparse
+import json
+import re
+import time
+from itertools import groupby
+
+from tetris import GRAVITY, LEFT, PLACE, RIGHT, ROTATE, SOFT_DROP, TetrisGame
+
+VERSION = 1
+
+_TOKEN = f"{re.escape(PLACE)}\\d\\d|[{re.escape(LEFT + RIGHT + SOFT_DROP + ROTATE + GRAVITY)}]"
+_RUN = re.compile(f"(\\d*)({_TOKEN})")
+_LOG = re.compile(f"(?:\\d*(?:{_TOKEN}))*")
+
+
+def encode(actions):
+    """Action tokens -> run-length encoded string."""
+    return ''.join(f"{count if count > 1 else ''}{token}"
+                   for token, count in ((token, len(list(run))) for token, run in groupby(actions)))
+
+
+def decode(text):
+    """Run-length encoded string -> list of action tokens."""
+    if not _LOG.fullmatch(text):
+        raise ValueError("malformed action log")
+    actions = []
+    for count, token in _RUN.findall(text):
+        actions.extend([token] * int(count or 1))
+    return actions
+
+
+def record(game):
+    """A finished (or interrupted) game as a JSON-ready dict."""
+    return {
+        'version': VERSION,
+        'seed': game.seed,
+        'randomizer': game.randomizer,
+        'actions': encode(game.actions),
+        'score': game.score,
+        'lines': game.lines_cleared,
+        'board': game.board,
+    }
+
+
+def save(game, path):
+    with open(path, 'w') as f:
+        json.dump(record(game), f)
+        f.write('\n')
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    if data.get('version') != VERSION:
+        raise ValueError(f"{path}: unsupported replay version {data.get('version')!r}")
+    return data
+
+
+def replay(data, verify=True, on_action=None):
+    """Re-run a recorded game; returns the resulting TetrisGame.
+
+    on_action(game) is called after every action. With verify, raises
+    ValueError if an action doesn't apply or the game ends differently.
+    """
+    game = TetrisGame(data['seed'], data['randomizer'])
+    game.spawn_piece()
+    for number, token in enumerate(decode(data['actions']), 1):
+        if game.game_over:
+            raise ValueError(f"action {number} ({token!r}) comes after the game ended")
+        if not game.apply(token) and verify:
+            raise ValueError(f"action {number} ({token!r}) changed nothing; "
+                             f"the replay doesn't match this version of the game")
+        if on_action:
+            on_action(game)
+    recorded = (data['score'], data['lines'], data['board'])
+    if verify and (game.score, game.lines_cleared, game.board) != recorded:
+        raise ValueError(f"replay ended with score {game.score}, {game.lines_cleared} lines; "
+                         f"recorded score {data['score']}, {data['lines']} lines"
+                         + ("" if game.board == data['board'] else ", and the boards differ"))
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('replay', help="file written by tetris.py --record or replay_tetris.save()")
+    parser.add_argument('--show', action='store_true', help="draw the board after each action")
+    parser.add_argument('--delay', type=float, default=0.02, help="seconds per action with --show")
+    args = parser.parse_args()
+
+    data = load(args.replay)
+
+    def show(game):
+        game.print_board()
+        time.sleep(args.delay)
+
+    start = time.perf_counter()
+    game = replay(data, on_action=show if args.show else None)
+    elapsed = time.perf_counter() - start
+    actions = len(game.actions)
+    print(f"replay OK: {actions} actions, {game.lines_cleared} lines, score {game.score}, "
+          f"{actions / elapsed:,.0f} actions/s")
+
+
+if __name__ == "__main__":
+    main()
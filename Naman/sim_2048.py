@@ -0,0 +1,172 @@
+"""
+2048 Simulator - headless self-play statistics for game_2048
+Plays many games with no screen output on the packed board engine,
+spread over a process pool. Every game gets its own seeded RNG (seed +
+game number), so a run is reproducible whatever the worker count.
+
+Strategies are functions strategy(board, rng) -> direction, or None
+when no move is left; register_strategy() adds new ones.
+
+    python3 sim_2048.py --strategy random greedy corner --games 100000
+    python3 sim_2048.py --strategy expectimax --games 50 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import random
+import time
+from collections import Counter
+
+import board_2048
+from board_2048 import DOWN, LEFT, MOVES, RIGHT, UP, count_empty, max_exponent, move, spawn_tile
+
+CHUNK = 200             # games per task sent to a worker
+EXPECTIMAX_DEPTH = 2    # fixed depth (not a time budget) so runs are reproducible
+
+STRATEGIES = {}
+
+
+def register_strategy(name):
+    """Decorator adding a strategy factory: factory() -> strategy(board, rng)."""
+    def decorator(factory):
+        STRATEGIES[name] = factory
+        return factory
+    return decorator
+
+
+def _legal(board):
+    """(direction, new board, points) for every move that changes the board."""
+    result = []
+    for direction in MOVES:
+        after, gained = move(board, direction)
+        if after != board:
+            result.append((direction, after, gained))
+    return result
+
+
+@register_strategy('random')
+def random_strategy():
+    """Any legal move, uniformly."""
+    def choose(board, rng):
+        legal = _legal(board)
+        return rng.choice(legal)[0] if legal else None
+    return choose
+
+
+@register_strategy('greedy')
+def greedy_strategy():
+    """The move that scores most now, then leaves most empty cells."""
+    def choose(board, rng):
+        legal = _legal(board)
+        if not legal:
+            return None
+        return max(legal, key=lambda m: (m[2], count_empty(m[1])))[0]
+    return choose
+
+
+@register_strategy('corner')
+def corner_strategy():
+    """Keep big tiles in the bottom-left corner: down, left, right, up in that order."""
+    order = (DOWN, LEFT, RIGHT, UP)
+
+    def choose(board, rng):
+        for direction in order:
+            if move(board, direction)[0] != board:
+                return direction
+        return None
+    return choose
+
+
+@register_strategy('expectimax')
+def expectimax_strategy(depth=EXPECTIMAX_DEPTH):
+    """ai_2048's search at a fixed depth."""
+    from ai_2048 import Expectimax
+    searcher = Expectimax()
+
+    def choose(board, rng):
+        return searcher.best_move(board, depth=depth)
+    return choose
+
+
+def play_game(strategy, rng):
+    """Play one game to the end; returns (score, max exponent, moves)."""
+    board = spawn_tile(spawn_tile(0, rng), rng)
+    score = 0
+    moves = 0
+    while True:
+        direction = strategy(board, rng)
+        if direction is None:
+            break
+        after, gained = move(board, direction)
+        if after == board:
+            raise ValueError(f"strategy chose an illegal move on {board:#018x}")
+        board = spawn_tile(after, rng)
+        score += gained
+        moves += 1
+    return score, max_exponent(board), moves
+
+
+def run_chunk(args):
+    """Worker task: play games first .. first+count-1; returns their results."""
+    name, seed, first, count = args
+    strategy = STRATEGIES[name]()
+    return [play_game(strategy, random.Random(seed + number))
+            for number in range(first, first + count)]
+
+
+def simulate(name, games, seed=0, workers=None, chunk=CHUNK):
+    """Play games with one strategy; returns (results, seconds)."""
+    tasks = [(name, seed, first, min(chunk, games - first)) for first in range(0, games, chunk)]
+    start = time.perf_counter()
+    if workers == 1:
+        chunks = map(run_chunk, tasks)
+        results = [r for part in chunks for r in part]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = [r for part in pool.imap(run_chunk, tasks) for r in part]
+    return results, time.perf_counter() - start
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def report(name, results, seconds):
+    """Print score distribution, max-tile histogram and throughput."""
+    scores = sorted(score for score, _, _ in results)
+    tiles = Counter(top for _, top, _ in results)
+    moves = sum(m for _, _, m in results)
+    games = len(results)
+    print(f"\n== {name}: {games} games in {seconds:.1f}s "
+          f"({games / seconds:.0f} games/s, {moves / seconds:.0f} moves/s)")
+    print(f"score  mean {sum(scores) / games:.0f}  "
+          + "  ".join(f"p{p} {percentile(scores, p)}" for p in (10, 50, 90, 99))
+          + f"  max {scores[-1]}")
+    reached = games
+    for exponent in sorted(tiles):
+        share = tiles[exponent] / games
+        print(f"  {1 << exponent:>6}  {tiles[exponent]:>8}  {100 * share:6.2f}%  "
+              f"reached {100 * reached / games:6.2f}%  {'#' * round(40 * share)}")
+        reached -= tiles[exponent]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--strategy', nargs='+', choices=sorted(STRATEGIES), default=['random'])
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--chunk', type=int, default=CHUNK, help="games per worker task")
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers, seed {args.seed}, "
+          f"win tile {1 << board_2048.WIN_EXPONENT}")
+    for name in args.strategy:
+        results, seconds = simulate(name, args.games, args.seed, args.workers, args.chunk)
+        report(name, results, seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Terminal - flicker-free screen drawing and key input for the CLI games
+A Screen keeps the last frame it drew. Each new frame (a list of text
+lines) is compared with it and only the characters that changed are
+rewritten, using ANSI cursor moves, in a single write. The screen is
+cleared once at the start instead of on every frame, so nothing blinks
+and no shell is spawned.
+
+A KeyReader puts the terminal in cbreak mode once, for the whole game,
+and reads keys on a background thread into a queue of timestamped
+KeyEvents. Arrow keys and other escape sequences are decoded even when
+their bytes arrive in separate reads; a lone ESC counts as the Escape
+key once ESC_TIMEOUT passes with nothing after it.
+
+    screen = terminal.screen()
+    screen.draw(["Score: 10", "|  # |"])
+
+    with terminal.KeyReader() as keys:
+        event = keys.get(timeout=0.1)   # None if no key came
+        if event and event.key == terminal.UP: ...
+
+When output isn't a terminal, frames are simply printed one after another.
+`python3 terminal.py` checks that Screen writes nothing but the frames.
+"""
+
+import atexit
+import codecs
+import io
+import os
+import queue
+import re
+import selectors
+import sys
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+
+try:
+    import termios
+    import tty
+except ImportError:     # Windows
+    termios = tty = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+ESC = '\x1b['
+CLEAR = ESC + '2J'
+CURSOR_HOME = ESC + 'H'
+CLEAR_LINE_END = ESC + 'K'
+HIDE_CURSOR = ESC + '?25l'
+SHOW_CURSOR = ESC + '?25h'
+
+
+def _goto(row, col):
+    """Cursor movement to a 0-based row and column."""
+    return f'{ESC}{row + 1};{col + 1}H'
+
+
+def _is_narrow(text):
+    """True if every character takes exactly one terminal column."""
+    return text.isascii() or all(
+        unicodedata.east_asian_width(ch) not in ('W', 'F') and not unicodedata.combining(ch)
+        for ch in text)
+
+
+def _enable_ansi():
+    """Windows consoles only understand ANSI escapes once VT mode is on."""
+    if os.name == 'nt':
+        os.system('')   # the documented side effect turns VT processing on
+
+
+class Screen:
+    def __init__(self, stream=None):
+        """Draw frames to stream (stdout by default)."""
+        self.stream = stream or sys.stdout
+        self.ansi = self.stream.isatty()
+        self.lines = None       # last frame drawn; None forces a full redraw
+        self.frames = 0
+        self.writes = 0
+        self.bytes_written = 0
+        if self.ansi:
+            _enable_ansi()
+
+    def draw(self, lines):
+        """Show a frame, writing only what differs from the last one."""
+        lines = list(lines)
+        self.frames += 1
+        if not self.ansi:
+            if lines != self.lines:
+                self._write('\n'.join(lines) + '\n')
+                self.lines = lines
+            return
+        out = []
+        previous = self.lines
+        if previous is None:
+            out.append(HIDE_CURSOR + CLEAR + CURSOR_HOME)
+            previous = []
+        for row, line in enumerate(lines):
+            old = previous[row] if row < len(previous) else ''
+            if line != old:
+                out.append(self._diff_line(row, old, line))
+        for row in range(len(lines), len(previous)):
+            out.append(_goto(row, 0) + CLEAR_LINE_END)
+        self.lines = lines
+        if out:
+            # Park the cursor under the frame so anything printed later lands there.
+            out.append(_goto(len(lines), 0))
+            self._write(''.join(out))
+
+    def _diff_line(self, row, old, new):
+        """Escape sequence + text that turn old into new on one row."""
+        if not (_is_narrow(old) and _is_narrow(new)):
+            # Column positions are unreliable with wide characters; redraw the row.
+            return _goto(row, 0) + new + CLEAR_LINE_END
+        out = []
+        col = 0
+        width = min(len(old), len(new))
+        while col < width:
+            if old[col] == new[col]:
+                col += 1
+                continue
+            start = col
+            # Keep short equal gaps inside a run; a cursor move costs more than them.
+            while col < width and (old[col] != new[col] or new[col:col + 6] != old[col:col + 6]):
+                col += 1
+            out.append(_goto(row, start) + new[start:col])
+        if len(new) > width:
+            out.append(_goto(row, width) + new[width:])
+        elif len(old) > width:
+            out.append(_goto(row, width) + CLEAR_LINE_END)
+        return ''.join(out)
+
+    def invalidate(self):
+        """Forget the last frame so the next draw repaints everything."""
+        self.lines = None
+
+    def close(self):
+        """Show the cursor again and leave it below the last frame."""
+        if self.ansi and self.lines is not None:
+            self._write(_goto(len(self.lines), 0) + SHOW_CURSOR)
+        self.lines = None
+
+    def _write(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+        self.writes += 1
+        self.bytes_written += len(text)
+
+
+_screen = None
+
+
+def screen():
+    """The shared Screen for stdout; the cursor is restored at exit."""
+    global _screen
+    if _screen is None:
+        _screen = Screen()
+        atexit.register(_screen.close)
+    return _screen
+
+
+# Names for keys that aren't a single character
+UP, DOWN, LEFT, RIGHT = 'up', 'down', 'left', 'right'
+HOME, END, INSERT, DELETE = 'home', 'end', 'insert', 'delete'
+PAGE_UP, PAGE_DOWN = 'page-up', 'page-down'
+ESCAPE = 'escape'
+EOF = 'eof'             # input closed; no more keys will come
+
+ESC_TIMEOUT = 0.05      # seconds to wait for the rest of an escape sequence
+
+KeyEvent = namedtuple('KeyEvent', 'key time')   # time is time.monotonic()
+
+_FINAL_KEYS = {'A': UP, 'B': DOWN, 'C': RIGHT, 'D': LEFT, 'H': HOME, 'F': END}
+_TILDE_KEYS = {'1': HOME, '2': INSERT, '3': DELETE, '4': END, '5': PAGE_UP,
+               '6': PAGE_DOWN, '7': HOME, '8': END}
+# Second code msvcrt.getwch() returns after a '\x00' or '\xe0' prefix
+_WINDOWS_KEYS = {'H': UP, 'P': DOWN, 'M': RIGHT, 'K': LEFT, 'G': HOME, 'O': END,
+                 'R': INSERT, 'S': DELETE, 'I': PAGE_UP, 'Q': PAGE_DOWN}
+
+
+class KeyDecoder:
+    def __init__(self):
+        """Turn terminal input bytes into keys, across any read boundaries."""
+        self._text = codecs.getincrementaldecoder('utf-8')('replace')
+        self.buffer = ''
+
+    def feed(self, data):
+        """Add bytes; returns the keys they complete."""
+        self.buffer += self._text.decode(data)
+        return self._keys(final=False)
+
+    def flush(self):
+        """Keys still buffered, with an unfinished escape sequence taken as typed."""
+        self.buffer += self._text.decode(b'', final=True)
+        return self._keys(final=True)
+
+    @property
+    def pending(self):
+        """True while an escape sequence might still be completed."""
+        return bool(self.buffer)
+
+    def _keys(self, final):
+        keys = []
+        buf = self.buffer
+        i = 0
+        while i < len(buf):
+            if buf[i] != '\x1b':
+                keys.append(buf[i])
+                i += 1
+                continue
+            key, length = self._sequence(buf, i)
+            if length is None:          # incomplete
+                if not final:
+                    break
+                key, length = ESCAPE, 1
+            keys.append(key)
+            i += length
+        self.buffer = buf[i:]
+        return keys
+
+    @staticmethod
+    def _sequence(buf, start):
+        """(key, length) for the escape sequence at start; length None if cut short."""
+        if start + 1 >= len(buf):
+            return None, None
+        kind = buf[start + 1]
+        if kind == 'O':                 # SS3: ESC O <letter>
+            if start + 2 >= len(buf):
+                return None, None
+            final = buf[start + 2]
+            return _FINAL_KEYS.get(final, buf[start:start + 3]), 3
+        if kind != '[':
+            return ESCAPE, 1            # Escape pressed on its own (or Alt+key)
+        # CSI: ESC [ parameters... final byte in @..~
+        end = start + 2
+        while end < len(buf) and not '@' <= buf[end] <= '~':
+            end += 1
+        if end >= len(buf):
+            return None, None
+        final = buf[end]
+        params = buf[start + 2:end]
+        if final == '~':
+            key = _TILDE_KEYS.get(params.split(';')[0])
+        else:
+            key = _FINAL_KEYS.get(final)
+        return key or buf[start:end + 1], end + 1 - start
+
+
+class KeyReader:
+    def __init__(self, stream=None, esc_timeout=ESC_TIMEOUT):
+        """Read keys from stream (stdin by default) once start() is called."""
+        self.stream = stream or sys.stdin
+        self.esc_timeout = esc_timeout
+        self.events = queue.Queue()
+        self._saved = None
+        self._thread = None
+        self._wake = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Switch to cbreak mode and start reading; the terminal is restored at exit."""
+        if self._thread:
+            return self
+        try:
+            fd = self.stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            fd = None
+        if msvcrt and self.stream.isatty():
+            target = self._read_console
+        elif fd is not None and os.name != 'nt':
+            if termios and self.stream.isatty():
+                self._saved = termios.tcgetattr(fd)
+                tty.setcbreak(fd)
+                atexit.register(self.close)
+            self._wake = os.pipe()
+            target = lambda: self._read_fd(fd)
+        else:
+            target = self._read_stream
+        self._thread = threading.Thread(target=target, name='key-reader', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Stop reading and put the terminal back the way it was."""
+        self._stop.set()
+        if self._wake:
+            os.write(self._wake[1], b'x')
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(0.5)
+        if self._saved is not None:
+            termios.tcsetattr(self.stream.fileno(), termios.TCSADRAIN, self._saved)
+            self._saved = None
+        if self._wake:
+            for end in self._wake:
+                os.close(end)
+            self._wake = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, timeout=None):
+        """Next KeyEvent; blocks up to timeout seconds (forever if None), then None."""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def pending(self):
+        """Every KeyEvent already queued, without waiting."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _emit(self, keys):
+        now = time.monotonic()
+        for key in keys:
+            self.events.put(KeyEvent(key, now))
+
+    def _read_fd(self, fd):
+        """Thread body for POSIX terminals and pipes."""
+        decoder = KeyDecoder()
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            selector.register(self._wake[0], selectors.EVENT_READ)
+            while not self._stop.is_set():
+                # Only wait a short time when an escape sequence is half read.
+                ready = selector.select(self.esc_timeout if decoder.pending else None)
+                if not ready:
+                    self._emit(decoder.flush())
+                    continue
+                if not any(key.fd == fd for key, _ in ready):
+                    break       # woken by close()
+                data = os.read(fd, 1024)
+                if not data:
+                    self._emit(decoder.flush() + [EOF])
+                    break
+                self._emit(decoder.feed(data))
+
+    def _read_console(self):
+        """Thread body for the Windows console."""
+        while not self._stop.is_set():
+            if not msvcrt.kbhit():
+                time.sleep(0.01)
+                continue
+            ch = msvcrt.getwch()
+            if ch in ('\x00', '\xe0'):
+                code = msvcrt.getwch()
+                self._emit([_WINDOWS_KEYS.get(code, ch + code)])
+            elif ch == '\x1b':
+                self._emit([ESCAPE])
+            else:
+                self._emit([ch])
+
+    def _read_stream(self):
+        """Thread body for anything else (e.g. redirected input on Windows)."""
+        while not self._stop.is_set():
+            ch = self.stream.read(1)
+            if not ch:
+                self._emit([EOF])
+                break
+            self._emit([ch])
+
+
+_ESCAPE_SEQUENCE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+
+
+class _FakeTerminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+def check():
+    """Draw a few frames to a fake terminal and make sure that, with the
+    escape sequences taken out, only the changed characters were written."""
+    frames = [(["Score: 0", "|ab  |", "|    |"], "Score: 0|ab  ||    |"),
+              (["Score: 40", "|ab  |", "|  cd|"], "40cd"),
+              (["Score: 40", "|a"], "")]
+    stream = _FakeTerminal()
+    screen = Screen(stream)
+    for lines, expected in frames:
+        start = stream.tell()
+        screen.draw(lines)
+        text = _ESCAPE_SEQUENCE.sub('', stream.getvalue()[start:])
+        if text != expected:
+            raise AssertionError(f"drawing {lines} wrote {text!r}, expected {expected!r}")
+    print("terminal: Screen output OK")
+
+
+if __name__ == "__main__":
+    check()
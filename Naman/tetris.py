@@ -1,55 +1,127 @@
 """
 Tetris Game (CLI) - Python Implementation
 A falling block puzzle game.
+The board is one integer per row (bit x set = column x filled), and all
+four rotations of every tetromino are worked out once at import time as
+row bitmasks pre-shifted to every column, so checking a position for
+collisions is a bounds check and one AND per piece row.
+
+Pieces come from a seeded generator, uniform or 7-bag (each piece once
+in every group of seven). Every action that changes the game, key or
+gravity tick, goes through apply() and is logged, so the seed plus
+that log replays a game exactly (see replay_tetris.py).
 """
 
+import argparse
 import random
 import time
-import os
-import sys
+from collections import namedtuple
+
+import terminal
 
 BOARD_WIDTH = 10
 BOARD_HEIGHT = 20
+FULL_ROW = (1 << BOARD_WIDTH) - 1
+CELL_CHARS = {0: " ", 1: "█", 2: "▓"}   # empty, locked block, falling piece
+MIN_FALL_SPEED = 0.05   # seconds per row from level 10 on
+MAX_CATCH_UP = 5        # gravity ticks the loop will run to catch up after a stall
 
 # Tetromino shapes (I, J, L, O, S, T, Z)
 TETROMINOES = {
-    'I': [
-        ['####']
-    ],
-    'J': [
-        ['#  ',
-         '###']
-    ],
-    'L': [
-        ['  #',
-         '###']
-    ],
-    'O': [
-        ['##',
-         '##']
-    ],
-    'S': [
-        [' ##',
-         '## ']
-    ],
-    'T': [
-        [' # ',
-         '###']
-    ],
-    'Z': [
-        ['## ',
-         ' ##']
-    ]
+    'I': ['####'],
+    'J': ['#  ',
+          '###'],
+    'L': ['  #',
+          '###'],
+    'O': ['##',
+          '##'],
+    'S': [' ##',
+          '## '],
+    'T': [' # ',
+          '###'],
+    'Z': ['## ',
+          ' ##'],
 }
 
+# One rotation of a piece: its bounding box, the row masks with the box at
+# column 0, and at[x] = those masks shifted to column x (for every x that fits).
+Rotation = namedtuple('Rotation', 'width height rows at')
+
+
+def _rotations(shape):
+    """All four clockwise rotations of a character grid, as Rotations."""
+    rotations = []
+    grid = [list(row) for row in shape]
+    for _ in range(4):
+        rows = tuple(sum(1 << j for j, cell in enumerate(row) if cell == '#') for row in grid)
+        width = len(grid[0])
+        at = tuple(tuple(mask << x for mask in rows) for x in range(BOARD_WIDTH - width + 1))
+        rotations.append(Rotation(width, len(grid), rows, at))
+        # Transpose and reverse rows
+        grid = [list(row) for row in zip(*grid[::-1])]
+    return tuple(rotations)
+
+
+ROTATIONS = {name: _rotations(shape) for name, shape in TETROMINOES.items()}
+PIECES = tuple(TETROMINOES)
+
+# One token per action in TetrisGame.actions: the keys that play them, and the clock
+LEFT, RIGHT, SOFT_DROP, ROTATE, GRAVITY = 'a', 'd', 's', 'w', '.'
+PLACE = 'p'     # 'p' + rotation + column: drop straight down from the top (tetris_ai)
+
+
+def uniform_pieces(rng):
+    """Endless pieces, each one any of the seven."""
+    while True:
+        yield rng.choice(PIECES)
+
+
+def bag_pieces(rng):
+    """Endless pieces as shuffled bags of all seven, so no piece waits more than 12 turns."""
+    bag = list(PIECES)
+    while True:
+        rng.shuffle(bag)
+        yield from bag
+
+
+RANDOMIZERS = {'uniform': uniform_pieces, 'bag': bag_pieces}
+
+
+def clear_full_rows(board, top=0, bottom=BOARD_HEIGHT):
+    """Remove the full rows among board[top:bottom], dropping everything above
+    them, in one pass; returns how many were removed.
+
+    Rows below the lowest full row stay where they are.
+    """
+    last = -1
+    for y in range(top, bottom):
+        if board[y] == FULL_ROW:
+            last = y
+    if last < 0:
+        return 0
+    kept = [row for row in board[:last + 1] if row != FULL_ROW]
+    cleared = last + 1 - len(kept)
+    board[:last + 1] = [0] * cleared + kept
+    return cleared
+
+
 class TetrisGame:
-    def __init__(self):
-        """Initialize the game."""
-        self.board = [[0 for _ in range(BOARD_WIDTH)] for _ in range(BOARD_HEIGHT)]
+    def __init__(self, seed=None, randomizer='uniform'):
+        """Initialize the game.
+        
+        The pieces come from RANDOMIZERS[randomizer] seeded with seed (a
+        random one if not given, kept in self.seed for replays).
+        """
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.randomizer = randomizer
+        self.pieces = RANDOMIZERS[randomizer](random.Random(self.seed))
+        self.actions = []   # tokens of every action that changed the game
+        self.board = [0] * BOARD_HEIGHT     # one bitmask per row, top row first
         self.current_piece = None
+        self.next_piece = None
         self.current_x = 0
         self.current_y = 0
-        self.current_shape = None
+        self.rotation = 0
         self.score = 0
         self.lines_cleared = 0
         self.level = 1
@@ -57,90 +129,81 @@ class TetrisGame:
         self.fall_time = 0
         self.fall_speed = 0.5  # seconds
     
+    @property
+    def current_shape(self):
+        """Rotation of the falling piece, or None between pieces."""
+        if self.current_piece is None:
+            return None
+        return ROTATIONS[self.current_piece][self.rotation]
+    
     def print_board(self):
         """Print the current state of the board."""
-        os.system('clear' if os.name == 'posix' else 'cls')
-        print("=" * 50)
-        print("TETRIS GAME")
-        print("=" * 50)
-        print(f"Score: {self.score} | Lines: {self.lines_cleared} | Level: {self.level}")
-        print("\n" + "-" * (BOARD_WIDTH + 2))
-        
-        # Create display board with current piece
-        display_board = [row[:] for row in self.board]
+        lines = [
+            "=" * 50,
+            "TETRIS GAME",
+            "=" * 50,
+            f"Score: {self.score} | Lines: {self.lines_cleared} | Level: {self.level}"
+            f" | Next: {self.next_piece}",
+            "",
+            "-" * (BOARD_WIDTH + 2),
+        ]
         
-        if self.current_piece:
-            shape = self.current_shape
-            for i, row in enumerate(shape):
-                for j, cell in enumerate(row):
-                    if cell == '#':
-                        board_y = self.current_y + i
-                        board_x = self.current_x + j
-                        if 0 <= board_y < BOARD_HEIGHT and 0 <= board_x < BOARD_WIDTH:
-                            display_board[board_y][board_x] = 2
+        # Falling piece, as one mask per board row
+        piece_rows = [0] * BOARD_HEIGHT
+        shape = self.current_shape
+        if shape:
+            for i, mask in enumerate(shape.at[self.current_x]):
+                piece_rows[self.current_y + i] = mask
         
-        # Print board
-        for row in display_board:
-            print("|", end="")
-            for cell in row:
-                if cell == 0:
-                    print(" ", end="")
-                elif cell == 1:
-                    print("█", end="")
-                elif cell == 2:
-                    print("▓", end="")
-            print("|")
+        # Board rows; only the cells that changed since the last frame are redrawn
+        for row, piece in zip(self.board, piece_rows):
+            lines.append("|" + "".join(
+                CELL_CHARS[2 if piece >> x & 1 else row >> x & 1] for x in range(BOARD_WIDTH)) + "|")
         
-        print("-" * (BOARD_WIDTH + 2))
-        print("\nControls: A/D (left/right), S (down), W (rotate), Q (quit)")
+        lines.append("-" * (BOARD_WIDTH + 2))
+        lines += ["", "Controls: A/D (left/right), S (down), W (rotate), Q (quit)"]
+        terminal.screen().draw(lines)
     
     def spawn_piece(self):
         """Spawn a new random piece."""
-        piece_type = random.choice(list(TETROMINOES.keys()))
+        piece_type = self.next_piece or next(self.pieces)
+        self.next_piece = next(self.pieces)
         self.current_piece = piece_type
-        self.current_shape = [list(row) for row in TETROMINOES[piece_type]]
-        self.current_x = BOARD_WIDTH // 2 - len(self.current_shape[0]) // 2
+        self.rotation = 0
+        self.current_x = BOARD_WIDTH // 2 - self.current_shape.width // 2
         self.current_y = 0
         
         # Check game over
         if self.check_collision():
             self.game_over = True
     
-    def check_collision(self, dx=0, dy=0, shape=None):
+    def check_collision(self, dx=0, dy=0, rotation=None):
         """Check if current piece collides with board or boundaries."""
-        if shape is None:
-            shape = self.current_shape
+        shape = ROTATIONS[self.current_piece][self.rotation if rotation is None else rotation]
+        x = self.current_x + dx
+        y = self.current_y + dy
         
-        new_x = self.current_x + dx
-        new_y = self.current_y + dy
-        
-        for i, row in enumerate(shape):
-            for j, cell in enumerate(row):
-                if cell == '#':
-                    board_y = new_y + i
-                    board_x = new_x + j
-                    
-                    # Check boundaries
-                    if board_x < 0 or board_x >= BOARD_WIDTH or board_y >= BOARD_HEIGHT:
-                        return True
-                    
-                    # Check collision with fixed blocks
-                    if board_y >= 0 and self.board[board_y][board_x] == 1:
-                        return True
+        # Check boundaries
+        if x < 0 or x + shape.width > BOARD_WIDTH or y + shape.height > BOARD_HEIGHT:
+            return True
         
+        # Check collision with fixed blocks
+        board = self.board
+        for i, mask in enumerate(shape.at[x]):
+            if board[y + i] & mask:
+                return True
         return False
     
     def rotate_piece(self):
         """Rotate the current piece 90 degrees clockwise."""
-        if not self.current_shape:
+        if self.current_piece is None:
             return
         
-        # Transpose and reverse rows
-        rotated = [list(row) for row in zip(*self.current_shape[::-1])]
+        rotated = (self.rotation + 1) % 4
         
         # Check if rotation is valid
-        if not self.check_collision(shape=rotated):
-            self.current_shape = rotated
+        if not self.check_collision(rotation=rotated):
+            self.rotation = rotated
     
     def move_piece(self, dx, dy):
         """Move the current piece."""
@@ -150,118 +213,115 @@ class TetrisGame:
             return True
         return False
     
+    def hard_drop(self, rotation, x):
+        """Drop the current piece straight down from the top in this rotation
+        and column, and lock it."""
+        self.rotation, self.current_x, self.current_y = rotation, x, 0
+        if self.check_collision():
+            raise ValueError(f"{self.current_piece} in rotation {rotation} "
+                             f"doesn't fit at column {x}")
+        while not self.check_collision(0, 1):
+            self.current_y += 1
+        self.lock_piece()
+    
+    def apply(self, action):
+        """Play one action token (LEFT, RIGHT, SOFT_DROP, ROTATE, GRAVITY or a
+        PLACE token); returns True, and logs it, if the game changed."""
+        if action == LEFT:
+            changed = self.move_piece(-1, 0)
+        elif action == RIGHT:
+            changed = self.move_piece(1, 0)
+        elif action == ROTATE:
+            rotation = self.rotation
+            self.rotate_piece()
+            changed = self.rotation != rotation
+        elif action == SOFT_DROP or action == GRAVITY:
+            if not self.move_piece(0, 1):
+                self.lock_piece()
+            changed = True
+        elif action[0] == PLACE and len(action) == 3:
+            self.hard_drop(int(action[1]), int(action[2]))
+            changed = True
+        else:
+            raise ValueError(f"unknown action {action!r}")
+        if changed:
+            self.actions.append(action)
+        return changed
+    
     def lock_piece(self):
         """Lock the current piece to the board."""
-        for i, row in enumerate(self.current_shape):
-            for j, cell in enumerate(row):
-                if cell == '#':
-                    board_y = self.current_y + i
-                    board_x = self.current_x + j
-                    if 0 <= board_y < BOARD_HEIGHT and 0 <= board_x < BOARD_WIDTH:
-                        self.board[board_y][board_x] = 1
+        shape = self.current_shape
+        for i, mask in enumerate(shape.at[self.current_x]):
+            self.board[self.current_y + i] |= mask
         
         self.current_piece = None
-        self.clear_lines()
+        # Only the rows the piece landed in can have become full
+        self.clear_lines(self.current_y, self.current_y + shape.height)
         self.spawn_piece()
     
-    def clear_lines(self):
-        """Clear completed lines and shift blocks down."""
-        lines_to_clear = []
-        
-        for i in range(BOARD_HEIGHT):
-            if all(cell == 1 for cell in self.board[i]):
-                lines_to_clear.append(i)
-        
-        for line in lines_to_clear:
-            del self.board[line]
-            self.board.insert(0, [0 for _ in range(BOARD_WIDTH)])
+    def clear_lines(self, top=0, bottom=BOARD_HEIGHT):
+        """Clear completed lines among rows top..bottom-1 and shift blocks down."""
+        cleared = clear_full_rows(self.board, top, bottom)
         
-        if lines_to_clear:
-            self.lines_cleared += len(lines_to_clear)
+        if cleared:
+            self.lines_cleared += cleared
             # Score: 100 * lines^2 * level
-            self.score += 100 * (len(lines_to_clear) ** 2) * self.level
+            self.score += 100 * (cleared ** 2) * self.level
             # Level up every 10 lines
             self.level = (self.lines_cleared // 10) + 1
-            self.fall_speed = max(0.1, 0.5 - (self.level - 1) * 0.05)
+            self.fall_speed = max(MIN_FALL_SPEED, 0.5 - (self.level - 1) * 0.05)
     
     def play(self):
-        """Main game loop."""
+        """Main game loop.
+        
+        Gravity runs on a fixed timestep: ticks are due every fall_speed
+        seconds on the monotonic clock, however long drawing or input took.
+        Between deadlines the loop sleeps in the key reader, and the board
+        is only redrawn after something changed.
+        """
         self.spawn_piece()
-        last_fall = time.time()
+        next_fall = time.monotonic() + self.fall_speed
+        changed = True
         
-        try:
-            import tty
-            import termios
-            
-            def get_key():
-                """Get a single keypress."""
-                fd = sys.stdin.fileno()
-                old_settings = termios.tcgetattr(fd)
-                try:
-                    tty.setraw(sys.stdin.fileno())
-                    ch = sys.stdin.read(1)
-                finally:
-                    termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-                return ch
-            
+        with terminal.KeyReader() as keys:
             while not self.game_over:
-                self.print_board()
-                
-                # Auto-fall
-                current_time = time.time()
-                if current_time - last_fall >= self.fall_speed:
-                    if not self.move_piece(0, 1):
-                        self.lock_piece()
-                    last_fall = current_time
+                if changed:
+                    self.print_board()
+                    changed = False
                 
-                # Non-blocking input
-                import select
-                if select.select([sys.stdin], [], [], 0.1)[0]:
-                    key = get_key()
+                # Sleep until the next gravity tick, or less if a key comes first
+                event = keys.get(timeout=max(0.0, next_fall - time.monotonic()))
+                events = [event] + keys.pending() if event else []
+                for event in events:
+                    key = event.key.lower()
                     
-                    if key.lower() == 'q':
+                    if key == 'q' or key == terminal.EOF:
                         print("\nThanks for playing!")
+                        return
+                    elif key in ('a', terminal.LEFT):
+                        changed |= self.apply(LEFT)
+                    elif key in ('d', terminal.RIGHT):
+                        changed |= self.apply(RIGHT)
+                    elif key in ('s', terminal.DOWN):
+                        row = self.current_y
+                        self.apply(SOFT_DROP)
+                        if self.current_y <= row:
+                            # Locked; the new piece gets a full tick before it falls
+                            next_fall = time.monotonic() + self.fall_speed
+                        changed = True
+                    elif key in ('w', terminal.UP):
+                        changed |= self.apply(ROTATE)
+                    if self.game_over:
                         break
-                    elif key.lower() == 'a':
-                        self.move_piece(-1, 0)
-                    elif key.lower() == 'd':
-                        self.move_piece(1, 0)
-                    elif key.lower() == 's':
-                        if not self.move_piece(0, 1):
-                            self.lock_piece()
-                            last_fall = time.time()
-                    elif key.lower() == 'w':
-                        self.rotate_piece()
-        except ImportError:
-            # Fallback for Windows
-            print("\nNote: Real-time controls may not work on Windows.")
-            print("Use A/D/S/W keys and press Enter after each move.")
-            
-            while not self.game_over:
-                self.print_board()
-                
-                # Auto-fall
-                current_time = time.time()
-                if current_time - last_fall >= self.fall_speed:
-                    if not self.move_piece(0, 1):
-                        self.lock_piece()
-                    last_fall = current_time
                 
-                move = input("\nMove (a/d/s/w/q): ").strip().lower()
-                
-                if move == 'q':
-                    print("\nThanks for playing!")
-                    break
-                elif move == 'a':
-                    self.move_piece(-1, 0)
-                elif move == 'd':
-                    self.move_piece(1, 0)
-                elif move == 's':
-                    if not self.move_piece(0, 1):
-                        self.lock_piece()
-                        last_fall = time.time()
-                elif move == 'w':
-                    self.rotate_piece()
+                # Gravity: run every tick that is due
+                now = time.monotonic()
+                if now - next_fall > MAX_CATCH_UP * self.fall_speed:
+                    next_fall = now     # far behind (e.g. the process was stopped); don't replay it all
+                while now >= next_fall and not self.game_over:
+                    self.apply(GRAVITY)
+                    next_fall += self.fall_speed
+                    changed = True
         
         if self.game_over:
             self.print_board()
@@ -271,8 +331,19 @@ class TetrisGame:
 
 def main():
     """Main function to start the game."""
-    game = TetrisGame()
+    parser = argparse.ArgumentParser(description="Tetris in the terminal")
+    parser.add_argument('--seed', type=int, help="play a reproducible piece sequence")
+    parser.add_argument('--randomizer', choices=sorted(RANDOMIZERS), default='uniform',
+                        help="'bag' deals each piece once in every seven")
+    parser.add_argument('--record', metavar='FILE', help="save a replay of the game here")
+    args = parser.parse_args()
+    
+    game = TetrisGame(args.seed, args.randomizer)
     game.play()
+    if args.record:
+        import replay_tetris
+        replay_tetris.save(game, args.record)
+        print(f"Replay saved to {args.record}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,262 @@
+"""
+Tetris AI - placement search player for tetris.py
+For each piece, every place it can be hard-dropped (each distinct
+rotation in each column) is tried on the bitmask board, and the
+resulting boards are scored by a weighted sum of features:
+
+- aggregate height: the heights of all columns added up
+- complete lines: rows cleared by the drop
+- holes: empty cells with a filled cell somewhere above them
+- bumpiness: how much neighbouring column heights differ
+
+With lookahead the next piece (TetrisGame.next_piece) is placed too, and
+each first placement is worth the best board the pair can reach.
+
+Self-play runs headless over a process pool, which is also what
+--tune uses to hill-climb the weights.
+
+    python3 tetris_ai.py                        # watch it play
+    python3 tetris_ai.py --games 200 --quiet --workers 8
+    python3 tetris_ai.py --tune 20 --games 64
+"""
+
+import argparse
+import multiprocessing
+import random
+import time
+from collections import namedtuple
+
+from tetris import (BOARD_HEIGHT, BOARD_WIDTH, FULL_ROW, PLACE, RANDOMIZERS, ROTATIONS, TetrisGame,
+                    clear_full_rows)
+
+MAX_PIECES = 10000          # self-play games stop here even if not lost
+TUNE_PIECES = 500           # shorter games while tuning
+TUNE_STEP = 0.2             # size of each random change to the weights
+
+Weights = namedtuple('Weights', 'height lines holes bumpiness')
+# A well-known hand-tuned set; multiply all four by any positive number for the same play.
+DEFAULT_WEIGHTS = Weights(height=-0.510066, lines=0.760666, holes=-0.35663, bumpiness=-0.184483)
+
+
+def _distinct_rotations(rotations):
+    """(index, Rotation, lowest row of each column) for rotations that differ."""
+    result = []
+    seen = set()
+    for index, shape in enumerate(rotations):
+        if shape.rows in seen:
+            continue
+        seen.add(shape.rows)
+        bottoms = tuple(max(i for i, mask in enumerate(shape.rows) if mask >> c & 1)
+                        for c in range(shape.width))
+        result.append((index, shape, bottoms))
+    return result
+
+
+DISTINCT_ROTATIONS = {name: _distinct_rotations(rotations) for name, rotations in ROTATIONS.items()}
+
+
+def column_heights(board):
+    """Height of the highest filled cell in each column (0 if empty)."""
+    heights = [0] * BOARD_WIDTH
+    covered = 0
+    for y, row in enumerate(board):
+        new = row & ~covered
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = BOARD_HEIGHT - y
+            new ^= low
+        covered |= row
+        if covered == FULL_ROW:
+            break
+    return heights
+
+
+def placements(board, piece):
+    """Every hard drop of piece: (rotation, x, y, board after, lines cleared)."""
+    tops = [BOARD_HEIGHT - height for height in column_heights(board)]
+    for index, shape, bottoms in DISTINCT_ROTATIONS[piece]:
+        for x in range(BOARD_WIDTH - shape.width + 1):
+            # The piece stops on the highest filled cell under any of its columns.
+            y = min(tops[x + c] - 1 - bottom for c, bottom in enumerate(bottoms))
+            if y < 0:
+                continue
+            after = board[:]
+            for i, mask in enumerate(shape.at[x]):
+                after[y + i] |= mask
+            lines = clear_full_rows(after, y, y + shape.height)
+            yield index, x, y, after, lines
+
+
+def evaluate(board, lines, weights=DEFAULT_WEIGHTS):
+    """Weighted feature score of a board reached by clearing lines rows."""
+    heights = [0] * BOARD_WIDTH
+    covered = 0
+    holes = 0
+    for y, row in enumerate(board):
+        if covered:
+            holes += (covered & ~row).bit_count()
+        new = row & ~covered
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = BOARD_HEIGHT - y
+            new ^= low
+        covered |= row
+    bumpiness = 0
+    for a, b in zip(heights, heights[1:]):
+        bumpiness += a - b if a > b else b - a
+    return (weights.height * sum(heights) + weights.lines * lines
+            + weights.holes * holes + weights.bumpiness * bumpiness)
+
+
+def best_placement(board, piece, next_piece=None, weights=DEFAULT_WEIGHTS):
+    """(rotation, x, y) of the best drop for piece, or None if none fits.
+
+    With next_piece, each drop is scored by the best follow-up drop of
+    next_piece (lines from both count).
+    """
+    best = None
+    best_value = None
+    for index, x, y, after, lines in placements(board, piece):
+        if next_piece is None:
+            value = evaluate(after, lines, weights)
+        else:
+            value = max((evaluate(second, lines + more, weights)
+                         for _, _, _, second, more in placements(after, next_piece)),
+                        default=None)
+            if value is None:
+                continue
+        if best_value is None or value > best_value:
+            best = (index, x, y)
+            best_value = value
+    if best is None and next_piece is not None:
+        # Every drop loses on the next piece; take the best one anyway.
+        return best_placement(board, piece, None, weights)
+    return best
+
+
+def autoplay(game=None, weights=DEFAULT_WEIGHTS, lookahead=False, max_pieces=MAX_PIECES,
+             show=True, delay=0.0):
+    """Let the AI play until it loses or max_pieces are down; returns (game, pieces)."""
+    game = game or TetrisGame()
+    if game.current_piece is None and not game.game_over:
+        game.spawn_piece()
+    pieces = 0
+    while not game.game_over and pieces < max_pieces:
+        if show:
+            game.print_board()
+            time.sleep(delay)
+        choice = best_placement(game.board, game.current_piece,
+                                game.next_piece if lookahead else None, weights)
+        if choice is None:
+            game.game_over = True
+            break
+        rotation, x, _ = choice
+        game.apply(f"{PLACE}{rotation}{x}")
+        pieces += 1
+    if show:
+        game.print_board()
+    return game, pieces
+
+
+def play_game(args):
+    """Worker task: one headless game; returns (lines, score, pieces)."""
+    weights, seed, max_pieces, lookahead, randomizer = args
+    game, pieces = autoplay(TetrisGame(seed, randomizer), weights, lookahead, max_pieces,
+                            show=False)
+    return game.lines_cleared, game.score, pieces
+
+
+def self_play(weights, games, seed=0, workers=None, max_pieces=MAX_PIECES, lookahead=False,
+              pool=None, randomizer='uniform'):
+    """Play games (seeds seed .. seed+games-1); returns (results, seconds).
+
+    The same seeds and randomizer deal the same pieces, so two weight sets
+    can be compared on identical games.
+    """
+    tasks = [(weights, seed + number, max_pieces, lookahead, randomizer)
+             for number in range(games)]
+    start = time.perf_counter()
+    if pool is not None:
+        results = pool.map(play_game, tasks)
+    elif workers == 1:
+        results = list(map(play_game, tasks))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(play_game, tasks)
+    return results, time.perf_counter() - start
+
+
+def tune(rounds, games, seed=0, workers=None, max_pieces=TUNE_PIECES, lookahead=False,
+         weights=DEFAULT_WEIGHTS, randomizer='uniform'):
+    """Hill-climb the weights by mean lines cleared; returns (best weights, its mean)."""
+    rng = random.Random(seed)
+
+    def fitness(candidate, pool):
+        results, _ = self_play(candidate, games, seed, max_pieces=max_pieces,
+                               lookahead=lookahead, pool=pool, randomizer=randomizer)
+        return sum(lines for lines, _, _ in results) / games
+
+    with multiprocessing.Pool(workers) as pool:
+        best = fitness(weights, pool)
+        print(f"start  {_format(weights)}  mean lines {best:.1f}")
+        for number in range(1, rounds + 1):
+            candidate = Weights(*(w + rng.gauss(0, TUNE_STEP) * abs(w) for w in weights))
+            # Only the direction of the weight vector matters; keep it unit length.
+            norm = sum(w * w for w in candidate) ** 0.5
+            candidate = Weights(*(w / norm for w in candidate))
+            value = fitness(candidate, pool)
+            kept = value > best
+            if kept:
+                weights, best = candidate, value
+            print(f"round {number:>2} {_format(candidate)}  mean lines {value:.1f}"
+                  f"{'  (kept)' if kept else ''}")
+    return weights, best
+
+
+def _format(weights):
+    return " ".join(f"{name} {value:+.4f}" for name, value in weights._asdict().items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--games', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--pieces', type=int, default=MAX_PIECES, help="stop a game after this many")
+    parser.add_argument('--lookahead', action='store_true', help="also place the next piece")
+    parser.add_argument('--randomizer', choices=sorted(RANDOMIZERS), default='uniform')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--quiet', action='store_true', help="don't draw the board")
+    parser.add_argument('--delay', type=float, default=0.02, help="seconds per piece when drawn")
+    parser.add_argument('--tune', type=int, metavar='ROUNDS', help="hill-climb the weights")
+    args = parser.parse_args()
+
+    if args.tune:
+        pieces = min(args.pieces, TUNE_PIECES)
+        weights, best = tune(args.tune, args.games, args.seed, args.workers, pieces,
+                             args.lookahead, randomizer=args.randomizer)
+        print(f"best   {_format(weights)}  mean lines {best:.1f}")
+        return
+
+    if not args.quiet:
+        for number in range(args.games):
+            game, pieces = autoplay(TetrisGame(args.seed + number, args.randomizer),
+                                    lookahead=args.lookahead, max_pieces=args.pieces,
+                                    delay=args.delay)
+            print(f"game {number + 1}: {game.lines_cleared} lines, score {game.score}, "
+                  f"{pieces} pieces")
+        return
+
+    results, seconds = self_play(DEFAULT_WEIGHTS, args.games, args.seed, args.workers,
+                                 args.pieces, args.lookahead, randomizer=args.randomizer)
+    lines = sorted(lines for lines, _, _ in results)
+    pieces = sum(p for _, _, p in results)
+    print(f"{args.games} games in {seconds:.1f}s ({pieces / seconds:,.0f} pieces/s over "
+          f"{args.workers} workers)")
+    print(f"lines  mean {sum(lines) / len(lines):.1f}  min {lines[0]}  "
+          f"median {lines[len(lines) // 2]}  max {lines[-1]}")
+    print(f"games that reached {args.pieces} pieces: "
+          f"{sum(p >= args.pieces for _, _, p in results)}")
+
+
+if __name__ == "__main__":
+    main()